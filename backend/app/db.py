@@ -1,12 +1,19 @@
 
+import os
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from dotenv import load_dotenv
 from app.variable import *
+from app.db_pool import pool_options, install_pool_events
+from app.services.read_routing import DATABASE_READ_URL, user_prefers_primary, club_prefers_primary
 
-DATABASE_URL = f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+# DATABASE_URL이 있으면 우선 사용 (벤치마크 등 로컬 대체 DB)
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
 
-engine = create_async_engine(DATABASE_URL,pool_recycle=3600, pool_pre_ping=True)
+# 풀 크기/타임아웃/pre-ping 방식은 app/db_pool.py의 환경변수로 설정
+engine = create_async_engine(DATABASE_URL, **pool_options())
+install_pool_events(engine)
 
 
 AsyncSessionLocal = sessionmaker(
@@ -17,3 +24,43 @@ AsyncSessionLocal = sessionmaker(
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+# DATABASE_READ_URL이 있으면 조회 전용 API는 복제본 사용
+if DATABASE_READ_URL:
+    read_engine = create_async_engine(DATABASE_READ_URL, **pool_options())
+    install_pool_events(read_engine)
+else:
+    read_engine = engine
+
+
+#조회 전용 세션: info["primary"]가 설정되면 기본 DB, 아니면 복제본에서 실행
+class ReadRoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("primary"):
+            return engine.sync_engine
+        return read_engine.sync_engine
+
+
+ReadSessionLocal = sessionmaker(
+    class_=AsyncSession, sync_session_class=ReadRoutingSession, expire_on_commit=False
+)
+
+
+#조회 전용 API용 세션 (방금 쓰기를 한 사용자는 잠시 기본 DB 사용)
+async def get_read_db(request: Request):
+    async with ReadSessionLocal() as session:
+        if await user_prefers_primary(request):
+            session.info["primary"] = True
+        yield session
+
+
+#방금 데이터가 바뀐 동아리를 조회할 때는 기본 DB 사용
+async def use_primary_if_recent(db: AsyncSession, club_code: str):
+    if not db.info.get("primary") and await club_prefers_primary(club_code):
+        db.info["primary"] = True
+
+
+#응답 본문을 보내는 동안 쓸 세션 팩토리 (요청 세션과 같은 DB)
+def session_factory_for(db: AsyncSession):
+    return AsyncSessionLocal if db.info.get("primary") else ReadSessionLocal
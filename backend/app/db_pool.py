@@ -0,0 +1,164 @@
+import bisect
+import os
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+# always(기본): 꺼낼 때마다 확인 / idle: DB_PRE_PING_IDLE_SECONDS 이상 쉬었던 연결만 확인 / never: 확인 안 함
+# idle은 확인 쿼리를 줄이는 대신 쉬지 않은 연결이 끊겨 있으면 첫 쿼리가 실패할 수 있어 직접 켤 때만 사용
+DB_PRE_PING = os.getenv("DB_PRE_PING", "always").lower()
+DB_PRE_PING_IDLE_SECONDS = float(os.getenv("DB_PRE_PING_IDLE_SECONDS", "300"))
+
+# 연결을 얻기까지 기다린 시간 구간 (초)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolStats:
+    def __init__(self, buckets=WAIT_BUCKETS):
+        self.buckets = buckets
+        self.wait_counts = [0] * (len(buckets) + 1)
+        self.wait_sum = 0.0
+        self.waiting = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.pings = 0
+
+    def observe_wait(self, seconds: float):
+        self.wait_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.wait_sum += seconds
+
+    def histogram(self) -> dict:
+        cumulative, total = {}, 0
+        for bound, count in zip((*map(str, self.buckets), "+Inf"), self.wait_counts):
+            total += count
+            cumulative[bound] = total
+        return {"buckets": cumulative, "count": total, "sum": round(self.wait_sum, 6)}
+
+
+#연결을 꺼낼 때 대기 시간과 타임아웃을 기록하는 풀
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def connect(self):
+        self.stats.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.waiting -= 1
+            self.stats.observe_wait(time.perf_counter() - started)
+
+
+def pool_options() -> dict:
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_PRE_PING == "always",
+    }
+
+
+# idle 모드: 반납 시각을 기록해 두고 오래 쉬었던 연결만 꺼낼 때 ping
+# (끊긴 연결이면 DisconnectionError로 풀이 새 연결을 만들게 함)
+def install_pool_events(engine):
+    pool = engine.sync_engine.pool
+    dialect = engine.sync_engine.dialect
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+        if isinstance(pool, InstrumentedQueuePool):
+            pool.stats.connects += 1
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine.sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        if isinstance(pool, InstrumentedQueuePool):
+            pool.stats.invalidated += 1
+
+    if DB_PRE_PING != "idle":
+        return
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        idle = time.monotonic() - connection_record.info.get("checked_in_at", 0)
+        if idle < DB_PRE_PING_IDLE_SECONDS:
+            return
+        if isinstance(pool, InstrumentedQueuePool):
+            pool.stats.pings += 1
+        try:
+            dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            raise exc.DisconnectionError(f"idle connection failed ping: {e}") from e
+
+
+def pool_metrics(engine) -> dict:
+    pool = engine.sync_engine.pool
+    metrics = {
+        "pool": type(pool).__name__,
+        "settings": {
+            "size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "timeout": DB_POOL_TIMEOUT,
+            "recycle": DB_POOL_RECYCLE,
+            "pre_ping": DB_PRE_PING,
+            "pre_ping_idle_seconds": DB_PRE_PING_IDLE_SECONDS,
+        },
+    }
+    if not isinstance(pool, InstrumentedQueuePool):
+        return metrics
+    stats = pool.stats
+    metrics.update({
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "waiting": stats.waiting,
+        "timeouts": stats.timeouts,
+        "connects": stats.connects,
+        "invalidated": stats.invalidated,
+        "idle_pings": stats.pings,
+        "wait_seconds": stats.histogram(),
+    })
+    return metrics
+
+
+# Prometheus 텍스트 형식
+def pool_metrics_text(metrics: dict, name: str = "primary") -> str:
+    label = f'pool="{name}"'
+    lines = []
+    for key in ("checked_out", "checked_in", "overflow", "waiting"):
+        if key in metrics:
+            lines.append(f"# TYPE db_pool_{key} gauge")
+            lines.append(f"db_pool_{key}{{{label}}} {metrics[key]}")
+    for key in ("timeouts", "connects", "invalidated", "idle_pings"):
+        if key in metrics:
+            lines.append(f"# TYPE db_pool_{key}_total counter")
+            lines.append(f"db_pool_{key}_total{{{label}}} {metrics[key]}")
+    if "wait_seconds" in metrics:
+        histogram = metrics["wait_seconds"]
+        lines.append("# TYPE db_pool_wait_seconds histogram")
+        for bound, count in histogram["buckets"].items():
+            lines.append(f'db_pool_wait_seconds_bucket{{{label},le="{bound}"}} {count}')
+        lines.append(f"db_pool_wait_seconds_sum{{{label}}} {histogram['sum']}")
+        lines.append(f"db_pool_wait_seconds_count{{{label}}} {histogram['count']}")
+    return "\n".join(lines) + "\n"
@@ -3,6 +3,7 @@ from app.routes import user
 from app.routes import admin
 from app.routes import club
 from app.routes import attend
+from app.routes import metrics
 from fastapi.middleware.cors import CORSMiddleware
 from app.logger import setup_loggers, get_api_logger, get_user_logger, get_attendance_logger, get_admin_logger, get_club_logger
 import time
@@ -12,9 +13,14 @@ from urllib.parse import urlsplit, parse_qsl, urlencode, urlunsplit
 
 import os
 from fastapi_limiter import FastAPILimiter
-from redis.asyncio import Redis
+from app.redis_client import get_redis
+from app.services.checkin_buffer import checkin_buffer, ATTENDANCE_WRITE_BEHIND
+from app.services.code_scheduler import code_scheduler
+from app.services.session_hub import attendance_hub
+from app.services.read_routing import pin_user_after_write
 from app.models import Base
 from app.db import engine
+from app.migrations import migrate, check as check_schema
 from app.utils.request_ip import get_client_ip
 import base64
 
@@ -198,6 +204,13 @@ async def log_requests(request: Request, call_next):
     
     return response
 
+# 쓰기 직후의 조회가 복제 지연으로 이전 데이터를 보지 않도록 그 사용자는 잠시 기본 DB 사용
+@app.middleware("http")
+async def pin_primary_after_write(request: Request, call_next):
+    response = await call_next(request)
+    await pin_user_after_write(request, response.status_code)
+    return response
+
 cors_origins = [
     origin.strip()
     for origin in os.getenv(
@@ -215,15 +228,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# migrate: 남은 마이그레이션 적용 / check: 스키마 버전만 확인 (워커가 여러 개인 운영 환경)
+# create_all: 마이그레이션 없이 테이블만 생성 (로컬 테스트용)
+DB_SCHEMA_MODE = os.getenv("DB_SCHEMA_MODE", "migrate").lower()
+
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-    redis = Redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
-    await FastAPILimiter.init(redis)
+    if DB_SCHEMA_MODE == "check":
+        await check_schema(engine)
+    elif DB_SCHEMA_MODE == "create_all":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    else:
+        await migrate(engine)
+    await FastAPILimiter.init(get_redis())
+    if ATTENDANCE_WRITE_BEHIND:
+        checkin_buffer.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await attendance_hub.close()
+    await code_scheduler.close()
+    await checkin_buffer.close()
 
 app.include_router(user.router,tags=["user"])
 app.include_router(admin.router,tags=["admin"])
 app.include_router(club.router,tags=["club"])
 app.include_router(attend.router,tags=["attend"])
+app.include_router(metrics.router,tags=["metrics"])
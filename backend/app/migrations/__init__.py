@@ -0,0 +1,64 @@
+# 버전별 스키마 마이그레이션
+# 적용한 버전은 schema_version 테이블에 기록
+#   python -m app.migrations upgrade   # 남은 마이그레이션 적용
+#   python -m app.migrations current   # 현재/최신 버전 출력
+# 새 마이그레이션은 mNNNN_설명.py (VERSION, DESCRIPTION, upgrade(conn)) 로 추가하고 MIGRATIONS에 등록
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, select
+from sqlalchemy.exc import DBAPIError
+from app.migrations import m0001_initial, m0002_attendance_archive, m0003_fill_attendance_summaries
+
+MIGRATIONS = [m0001_initial, m0002_attendance_archive, m0003_fill_attendance_summaries]
+HEAD = MIGRATIONS[-1].VERSION
+
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# 테이블 목록을 읽지 않고 조회 한 번으로 확인 (테이블이 없으면 0)
+def current_version(conn) -> int:
+    try:
+        with conn.begin_nested():
+            return conn.scalar(select(func.max(schema_version.c.version))) or 0
+    except DBAPIError:
+        return 0
+
+
+def upgrade(conn) -> list:
+    version_metadata.create_all(conn)
+    current = current_version(conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.VERSION <= current:
+            continue
+        migration.upgrade(conn)
+        conn.execute(insert(schema_version).values(
+            version=migration.VERSION,
+            description=migration.DESCRIPTION,
+            applied_at=datetime.utcnow(),
+        ))
+        applied.append(migration.VERSION)
+    return applied
+
+
+async def migrate(engine) -> list:
+    async with engine.begin() as conn:
+        return await conn.run_sync(upgrade)
+
+
+#배포된 코드가 기대하는 버전과 DB 버전이 같은지만 확인 (부팅 시 reflection 없음)
+async def check(engine):
+    async with engine.connect() as conn:
+        version = await conn.run_sync(current_version)
+    if version != HEAD:
+        raise RuntimeError(
+            f"DB 스키마 버전이 {version}입니다. (필요: {HEAD}) "
+            "`python -m app.migrations upgrade`를 먼저 실행해주세요."
+        )
+    return version
@@ -0,0 +1,27 @@
+import argparse
+import asyncio
+import sys
+from app.db import engine
+from app.migrations import HEAD, migrate, current_version
+
+
+async def _main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="DB 스키마 마이그레이션")
+    parser.add_argument("command", choices=["upgrade", "current"])
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "upgrade":
+            applied = await migrate(engine)
+            print(f"[마이그레이션] 적용: {applied or '없음'} (최신 버전 {HEAD})")
+            return 0
+        async with engine.connect() as conn:
+            version = await conn.run_sync(current_version)
+        print(f"[마이그레이션] 현재 버전 {version} / 최신 버전 {HEAD}")
+        return 0 if version == HEAD else 1
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
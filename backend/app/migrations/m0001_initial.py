@@ -0,0 +1,177 @@
+# 기존 테이블 생성 + 자주 조회하는 컬럼의 인덱스와 (동아리, 날짜) 중복 방지
+# 이 마이그레이션을 작성한 시점의 스키마를 그대로 고정해 둔 것이므로 모델이 바뀌어도 수정하지 않음
+# (모델을 바꾸면 새 마이그레이션에 바뀐 부분만 추가)
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+    func,
+    inspect,
+    select,
+)
+
+VERSION = 1
+DESCRIPTION = "initial schema and hot-path indexes"
+
+metadata = MetaData()
+
+users = Table(
+    "users",
+    metadata,
+    Column("user_id", String(255), primary_key=True),
+    Column("gmail", String(255), unique=True, nullable=True),
+    Column("password_hash", String(255), nullable=True),
+    Column("name", String(100), nullable=False),
+    Column("is_leader", Boolean),
+    Column("is_leader_approved", Boolean, nullable=False),
+    Column("google_refresh_token", Text, nullable=True),
+)
+
+consent_agreements = Table(
+    "consent_agreements",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String(255), ForeignKey("users.user_id"), nullable=False),
+    Column("agreed_to_terms", Boolean, nullable=False),
+    Column("agreed_to_privacy", Boolean, nullable=False),
+    Column("consent_version", String(50), nullable=False),
+    Column("agreed_ip", String(64), nullable=True),
+    Column("user_agent", String(255), nullable=True),
+    Column("agreed_at", DateTime, nullable=False),
+)
+
+refresh_tokens = Table(
+    "refresh_tokens",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String(255), ForeignKey("users.user_id"), nullable=False),
+    Column("token", String(512), nullable=False, unique=True),
+    Column("expires_at", DateTime, nullable=False),
+    Column("is_revoked", Boolean),
+    Column("created_at", DateTime),
+)
+
+clubs = Table(
+    "clubs",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("club_name", String(100), nullable=False),
+    Column("club_code", String(20, collation="utf8mb4_bin"), unique=True, nullable=False),
+    Column("location_enabled", Boolean),
+    Column("latitude", Float, nullable=True),
+    Column("longitude", Float, nullable=True),
+    Column("radius_km", Float),
+)
+
+stuclubs = Table(
+    "stuclubs",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String(255), ForeignKey("users.user_id"), nullable=False),
+    Column("club_code", String(20, collation="utf8mb4_bin"), ForeignKey("clubs.club_code"), nullable=False),
+    Index("ix_stuclubs_user_id", "user_id"),
+    Index("ix_stuclubs_club_user", "club_code", "user_id"),
+)
+
+attendance_dates = Table(
+    "attendance_dates",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("club_code", String(20, collation="utf8mb4_bin"), ForeignKey("clubs.club_code"), nullable=False),
+    Column("date", Date, nullable=False),
+    Column("set_by", String(255), ForeignKey("users.user_id"), nullable=False),
+    Index("unique_club_date", "club_code", "date", unique=True),
+)
+
+attendance = Table(
+    "attendance",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String(255), ForeignKey("users.user_id"), nullable=False),
+    Column("attendance_date_id", Integer, ForeignKey("attendance_dates.id"), nullable=False),
+    Column("status", Boolean, nullable=False),
+    Column("timestamp", DateTime),
+    UniqueConstraint("user_id", "attendance_date_id", name="unique_user_attendance_date"),
+    Index("ix_attendance_date_id", "attendance_date_id"),
+)
+
+attendance_summaries = Table(
+    "attendance_summaries",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("club_code", String(20, collation="utf8mb4_bin"), ForeignKey("clubs.club_code"), nullable=False),
+    Column("user_id", String(255), ForeignKey("users.user_id"), nullable=False),
+    Column("attended_count", Integer, nullable=False),
+    Column("total_sessions", Integer, nullable=False),
+    Column("last_attended_at", DateTime, nullable=True),
+    UniqueConstraint("club_code", "user_id", name="unique_club_user_summary"),
+)
+
+club_schedules = Table(
+    "club_schedules",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("club_code", String(20, collation="utf8mb4_bin"), ForeignKey("clubs.club_code"), nullable=False),
+    Column("title", String(120), nullable=False),
+    Column("description", Text, nullable=True),
+    Column("scheduled_at", DateTime, nullable=False),
+    Column("created_by", String(255), ForeignKey("users.user_id"), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
+
+# 마이그레이션 도입 전에 만들어진 DB의 기존 테이블에 추가하는 인덱스
+INDEXES = [
+    ("stuclubs", "ix_stuclubs_user_id", ("user_id",), False),
+    ("stuclubs", "ix_stuclubs_club_user", ("club_code", "user_id"), False),
+    ("attendance_dates", "unique_club_date", ("club_code", "date"), True),
+    ("attendance", "ix_attendance_date_id", ("attendance_date_id",), False),
+]
+
+
+# 같은 컬럼으로 시작하는 인덱스가 이미 있으면 (MySQL이 외래키에 자동으로 만든 인덱스 등) 새로 만들지 않음
+def _covered(inspector, table: str, columns: tuple, unique: bool) -> bool:
+    existing = [(tuple(ix["column_names"]), bool(ix.get("unique"))) for ix in inspector.get_indexes(table)]
+    existing += [(tuple(uc["column_names"]), True) for uc in inspector.get_unique_constraints(table)]
+    for names, is_unique in existing:
+        if unique and is_unique and names == columns:
+            return True
+        if not unique and names[:len(columns)] == columns:
+            return True
+    return False
+
+
+def _check_duplicate_dates(conn):
+    duplicates = conn.execute(
+        select(attendance_dates.c.club_code, attendance_dates.c.date, func.count())
+        .group_by(attendance_dates.c.club_code, attendance_dates.c.date)
+        .having(func.count() > 1)
+    ).all()
+    if duplicates:
+        listed = ", ".join(f"{club_code} {date} ({count}개)" for club_code, date, count in duplicates[:20])
+        raise RuntimeError(
+            f"같은 동아리에 중복된 출석 날짜가 있어 unique_club_date를 만들 수 없습니다: {listed} "
+            "— 중복 날짜의 출석 기록을 정리한 뒤 다시 실행해주세요."
+        )
+
+
+def upgrade(conn):
+    # 마이그레이션 도입 전에 create_all로 만든 DB도 있으므로 없는 테이블만 생성 (새 테이블은 인덱스도 함께 생성)
+    metadata.create_all(conn)
+    inspector = inspect(conn)
+    for table_name, name, columns, unique in INDEXES:
+        if _covered(inspector, table_name, columns, unique):
+            continue
+        if unique:
+            _check_duplicate_dates(conn)
+        index = next(ix for ix in metadata.tables[table_name].indexes if ix.name == name)
+        index.create(conn)
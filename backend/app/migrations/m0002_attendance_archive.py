@@ -0,0 +1,92 @@
+# 학기별 출석 기록 보관용 테이블
+# m0001과 같이 작성 시점의 테이블 정의를 고정해 둠
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+)
+
+VERSION = 2
+DESCRIPTION = "attendance archive tables"
+
+metadata = MetaData()
+
+# 외래키 대상 (m0001에서 생성, 여기서는 만들지 않음)
+Table(
+    "clubs",
+    metadata,
+    Column("club_code", String(20, collation="utf8mb4_bin"), primary_key=True),
+)
+
+attendance_archives = Table(
+    "attendance_archives",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("club_code", String(20, collation="utf8mb4_bin"), ForeignKey("clubs.club_code"), nullable=False),
+    Column("label", String(100), nullable=False),
+    Column("date_from", Date, nullable=False),
+    Column("date_to", Date, nullable=False),
+    Column("date_count", Integer, nullable=False),
+    Column("record_count", Integer, nullable=False),
+    Column("created_by", String(255), nullable=True),
+    Column("created_at", DateTime, nullable=False),
+    Index("ix_attendance_archives_club", "club_code"),
+)
+
+archived_attendance_dates = Table(
+    "archived_attendance_dates",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("archive_id", Integer, ForeignKey("attendance_archives.id"), nullable=False),
+    Column("club_code", String(20, collation="utf8mb4_bin"), nullable=False),
+    Column("date", Date, nullable=False),
+    Column("set_by", String(255), nullable=True),
+    Index("ix_archived_dates_archive", "archive_id"),
+)
+
+archived_attendance = Table(
+    "archived_attendance",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("archive_id", Integer, ForeignKey("attendance_archives.id"), nullable=False),
+    Column("user_id", String(255), nullable=False),
+    Column("attendance_date_id", Integer, nullable=False),
+    Column("status", Boolean, nullable=False),
+    Column("timestamp", DateTime, nullable=True),
+    Index("ix_archived_attendance_archive_user", "archive_id", "user_id"),
+    Index("ix_archived_attendance_user", "user_id"),
+)
+
+archived_member_totals = Table(
+    "archived_member_totals",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("archive_id", Integer, ForeignKey("attendance_archives.id"), nullable=False),
+    Column("club_code", String(20, collation="utf8mb4_bin"), nullable=False),
+    Column("user_id", String(255), nullable=False),
+    Column("name", String(100), nullable=False),
+    Column("attended_count", Integer, nullable=False),
+    Column("total_sessions", Integer, nullable=False),
+    Column("last_attended_at", DateTime, nullable=True),
+    UniqueConstraint("archive_id", "user_id", name="unique_archive_user_total"),
+    Index("ix_archived_totals_user", "user_id"),
+)
+
+TABLES = [
+    attendance_archives,
+    archived_attendance_dates,
+    archived_attendance,
+    archived_member_totals,
+]
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=TABLES, checkfirst=False)
@@ -0,0 +1,36 @@
+# 요약 테이블이 생기기 전의 출석 기록으로 회원별 출석 요약 채우기
+# (m0001이 기존 DB에 빈 attendance_summaries를 만들므로, 이후로는 출석/날짜/회원이 바뀔 때 함께 갱신됨)
+from sqlalchemy import and_, exists, func, insert, select
+from app.migrations.m0001_initial import attendance, attendance_dates, attendance_summaries, stuclubs
+
+VERSION = 3
+DESCRIPTION = "fill attendance summaries"
+
+
+def upgrade(conn):
+    expected = (
+        select(
+            stuclubs.c.club_code,
+            stuclubs.c.user_id,
+            func.count(func.distinct(attendance.c.id)),
+            func.count(func.distinct(attendance_dates.c.id)),
+            func.max(attendance.c.timestamp),
+        )
+        .select_from(stuclubs)
+        .outerjoin(attendance_dates, attendance_dates.c.club_code == stuclubs.c.club_code)
+        .outerjoin(attendance, and_(
+            attendance.c.attendance_date_id == attendance_dates.c.id,
+            attendance.c.user_id == stuclubs.c.user_id,
+            attendance.c.status == True,
+        ))
+        # 이미 요약이 있는 회원은 그대로 둠
+        .where(~exists().where(
+            attendance_summaries.c.club_code == stuclubs.c.club_code,
+            attendance_summaries.c.user_id == stuclubs.c.user_id,
+        ))
+        .group_by(stuclubs.c.club_code, stuclubs.c.user_id)
+    )
+    conn.execute(insert(attendance_summaries).from_select(
+        ["club_code", "user_id", "attended_count", "total_sessions", "last_attended_at"],
+        expected,
+    ))
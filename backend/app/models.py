@@ -1,5 +1,5 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, UniqueConstraint, Float
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, UniqueConstraint, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -68,6 +68,12 @@ class StuClub(Base):
     user = relationship("User")
     club = relationship("Club", back_populates="members")
 
+    # 인덱스/제약을 바꾸면 app/migrations에 마이그레이션도 추가
+    __table_args__ = (
+        Index('ix_stuclubs_user_id', 'user_id'),
+        Index('ix_stuclubs_club_user', 'club_code', 'user_id'),
+    )
+
 
 class AttendanceDate(Base):
     __tablename__ = "attendance_dates"
@@ -79,6 +85,10 @@ class AttendanceDate(Base):
 
     attendances = relationship("Attendance", back_populates="attendance_date")
 
+    __table_args__ = (
+        Index('unique_club_date', 'club_code', 'date', unique=True),
+    )
+
 
 class Attendance(Base):
     __tablename__ = "attendance"
@@ -94,6 +104,92 @@ class Attendance(Base):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'attendance_date_id', name='unique_user_attendance_date'),
+        Index('ix_attendance_date_id', 'attendance_date_id'),
+    )
+
+
+# 동아리 회원별 출석 요약 (출석 기록이 바뀔 때 같은 트랜잭션에서 갱신)
+class AttendanceSummary(Base):
+    __tablename__ = "attendance_summaries"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    club_code = Column(String(20, collation="utf8mb4_bin"), ForeignKey("clubs.club_code"), nullable=False)
+    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    attended_count = Column(Integer, nullable=False, default=0)
+    total_sessions = Column(Integer, nullable=False, default=0)
+    last_attended_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('club_code', 'user_id', name='unique_club_user_summary'),
+    )
+
+
+# 보관 처리한 출석 기록 묶음 (학기 등 기준일 이전 기록을 출석 테이블에서 옮겨 둔 단위)
+class AttendanceArchive(Base):
+    __tablename__ = "attendance_archives"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    club_code = Column(String(20, collation="utf8mb4_bin"), ForeignKey("clubs.club_code"), nullable=False)
+    label = Column(String(100), nullable=False)
+    date_from = Column(Date, nullable=False)
+    date_to = Column(Date, nullable=False)
+    date_count = Column(Integer, nullable=False, default=0)
+    record_count = Column(Integer, nullable=False, default=0)
+    created_by = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_attendance_archives_club', 'club_code'),
+    )
+
+
+# 보관된 출석 날짜/기록은 원래 id를 그대로 유지 (탈퇴한 회원의 기록도 남도록 회원 외래키는 두지 않음)
+class ArchivedAttendanceDate(Base):
+    __tablename__ = "archived_attendance_dates"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    archive_id = Column(Integer, ForeignKey("attendance_archives.id"), nullable=False)
+    club_code = Column(String(20, collation="utf8mb4_bin"), nullable=False)
+    date = Column(Date, nullable=False)
+    set_by = Column(String(255), nullable=True)
+
+    __table_args__ = (
+        Index('ix_archived_dates_archive', 'archive_id'),
+    )
+
+
+class ArchivedAttendance(Base):
+    __tablename__ = "archived_attendance"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    archive_id = Column(Integer, ForeignKey("attendance_archives.id"), nullable=False)
+    user_id = Column(String(255), nullable=False)
+    attendance_date_id = Column(Integer, nullable=False)
+    status = Column(Boolean, nullable=False, default=False)
+    timestamp = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_archived_attendance_archive_user', 'archive_id', 'user_id'),
+        Index('ix_archived_attendance_user', 'user_id'),
+    )
+
+
+# 보관 시점의 회원별 출석 합계 (이름도 함께 보관)
+class ArchivedMemberTotal(Base):
+    __tablename__ = "archived_member_totals"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    archive_id = Column(Integer, ForeignKey("attendance_archives.id"), nullable=False)
+    club_code = Column(String(20, collation="utf8mb4_bin"), nullable=False)
+    user_id = Column(String(255), nullable=False)
+    name = Column(String(100), nullable=False)
+    attended_count = Column(Integer, nullable=False, default=0)
+    total_sessions = Column(Integer, nullable=False, default=0)
+    last_attended_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('archive_id', 'user_id', name='unique_archive_user_total'),
+        Index('ix_archived_totals_user', 'user_id'),
     )
 
 
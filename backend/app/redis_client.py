@@ -0,0 +1,12 @@
+from redis.asyncio import Redis
+from app.variable import REDIS_URL
+
+_redis = None
+
+
+#워커 단위로 공유하는 Redis 커넥션
+def get_redis() -> Redis:
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+    return _redis
@@ -1,12 +1,39 @@
-﻿from fastapi import APIRouter, Depends,WebSocket, Security, Path, WebSocketDisconnect, Request
+﻿from fastapi import APIRouter, Depends,WebSocket, Security, Path, WebSocketDisconnect, Request, Response, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db import get_db
+from app.db import get_db, get_read_db, use_primary_if_recent, session_factory_for
 from app.variable import *
 from app.schema.admin_schema import *
 from app.services.admin_service import *
 from app.services.club_service import get_club_admin
+from app.services.attendance_matrix import (
+    ROSTER_PAGE_MAX,
+    load_attendance_matrix,
+    parse_roster_columns,
+)
+from app.services.attend_service import parse_attendance_date
+from app.services.club_version import not_modified, ATTENDANCE
+from app.services.attendance_summary import load_club_summaries
+from app.services.attendance_analytics import load_club_analytics
+from app.services.attendance_archive import (
+    archive_club_attendance,
+    list_archives,
+    get_archive,
+    load_archive_totals,
+    load_club_archived_totals,
+    load_archive_matrix,
+)
+from app.services.export_service import (
+    EXPORT_FORMATS,
+    EXPORT_MEDIA_TYPES,
+    stream_excel,
+    stream_csv,
+    stream_parquet,
+    stream_matrix,
+    require_parquet,
+    export_filename,
+)
 from app.services.location_service import get_club_location_settings, update_club_location
 from app.services.schedule_service import (
     create_schedule,
@@ -15,13 +42,18 @@ from app.services.schedule_service import (
     update_schedule_for_club,
 )
 from app.services.service import *
+from app.services.session_store import attendance_store
+from app.services.attendance_events import attendance_events, CONTROL_EVENT_TYPES
+from app.services.session_hub import attendance_hub
+from app.services.export_jobs import export_jobs, DONE
 from app.schema.schedule_schema import ScheduleCreateRequest, ScheduleUpdateRequest, ScheduleResponse
 from app.logger import get_admin_logger
 from datetime import datetime
 from app.models import AttendanceDate
+from fastapi.responses import FileResponse
 import asyncio
-import random
-from collections import deque
+import json
+import os
 
 admin_logger = get_admin_logger()
 
@@ -34,18 +66,26 @@ router = APIRouter(
 )
 
 class AttendanceWebSocketManager:
-    def __init__(self):
-        self.attendance_codes = {}
-
-    def generate_random_code(self, club_code: str) -> str:
-        random_number = random.randint(100, 999)
-        return f"{random_number}"
+    def __init__(self, store=attendance_store, hub=attendance_hub):
+        self.store = store
+        self.hub = hub
+
+    #현재 출석 현황을 한 번 보낸 뒤 출석 이벤트를 실시간으로 전달
+    async def stream_checkins(self, websocket: WebSocket, club_code: str):
+        async with attendance_events.subscribe(club_code) as events:
+            snapshot = await self.store.snapshot(club_code)
+            if snapshot is not None:
+                await websocket.send_text(json.dumps({"type": "snapshot", **snapshot}, ensure_ascii=False))
+            async for event in events:
+                if event.get("type") in CONTROL_EVENT_TYPES:
+                    continue
+                await websocket.send_text(json.dumps(event, ensure_ascii=False))
 
     async def handle_connection(self, websocket: WebSocket, date: str):
         await websocket.accept()
         club_code = None
-        code_task = None
-        stop_called = False
+        session = None
+        events_task = None
 
         try:
             token = websocket.cookies.get("access_token")
@@ -69,43 +109,26 @@ class AttendanceWebSocketManager:
                     await websocket.send_text("존재하지않는 출석 날짜입니다.")
                     await websocket.close()
                     return
-            self.attendance_codes[club_code] = {
-                "valid_codes": deque(maxlen=5),
-                "accepted": False,
-                "date": date
-            }
-
-            async def generate_loop():
-                while True:
-                    if self.attendance_codes[club_code]["accepted"]:
-                        if not self.attendance_codes[club_code]["valid_codes"]:
-                            await asyncio.sleep(1)
-                            continue
-                        await websocket.send_text(self.attendance_codes[club_code]["valid_codes"][-1])
-                        print("코드출석으로 변경", self.attendance_codes[club_code]["valid_codes"][-1])
-                        break
-
-                    new_code = self.generate_random_code(club_code)
-                    full_code = f'{club_code}:{new_code}'
-
-                    self.attendance_codes[club_code]["valid_codes"].append(full_code)
-                    self.attendance_codes[club_code]["date"] = date
-
-                    await websocket.send_text(full_code)
-                    await asyncio.sleep(13)
-
-            code_task = asyncio.create_task(generate_loop())
+                # 같은 동아리·날짜의 세션이 있으면 합류하고, 없으면 새로 열어 코드 교체 시작
+                session = await self.hub.join(club_code, date, websocket, db)
 
             while True:
                 message = await websocket.receive_text()
+                self.hub.scheduler.touch(club_code, websocket)
                 if message == "code_attendance_accepted":
-                    self.attendance_codes[club_code]["accepted"] = True
-                    if self.attendance_codes[club_code]["valid_codes"]:
-                        print("코드출석으로 변경", self.attendance_codes[club_code]["valid_codes"][-1])
-                        await websocket.send_text(self.attendance_codes[club_code]["valid_codes"][-1])
+                    latest_code = await self.hub.accept(session)
+                    print("코드출석으로 변경", latest_code)
+                elif message == "ping":
+                    # ping을 보내는 클라이언트는 응답이 끊기면 스케줄러가 연결을 정리
+                    self.hub.scheduler.touch(club_code, websocket, heartbeat=True)
+                    await websocket.send_text("pong")
+                elif message == "subscribe_checkins":
+                    # 기존 클라이언트는 모든 메시지를 코드로 취급하므로 요청한 소켓에만 JSON 이벤트 전송
+                    if events_task is None:
+                        events_task = asyncio.create_task(self.stream_checkins(websocket, club_code))
                 elif message == "stop_attendance":
-                    await websocket.send_text("출석종료")
-                    stop_called = True
+                    # 연결된 모든 화면에 종료를 알리고 세션 정리
+                    await self.hub.stop(session)
                     break
                 else:
                     await websocket.send_text(f"받은 메시지: {message}")
@@ -115,14 +138,15 @@ class AttendanceWebSocketManager:
         except Exception as e:
             print(f"[에러] {e}")
         finally:
-            if code_task:
-                code_task.cancel()
-            if club_code in self.attendance_codes:
-                del self.attendance_codes[club_code]
-                print(f"[정리] 출석코드 삭제됨: {club_code}")
-            await websocket.close()
-            if stop_called:
+            if events_task:
+                events_task.cancel()
+            if session:
+                await self.hub.leave(session, websocket)
+            try:
                 await websocket.close()
+            except RuntimeError:
+                # 이미 닫힌 연결
+                pass
 
 
 
@@ -151,6 +175,19 @@ async def add_date(data: DateRequest, request: Request, credentials: Optional[HT
 
 
 
+#여러 날짜 / 매주 반복 날짜 한 번에 추가
+@router.post("/add_dates")
+async def add_dates(data: BulkDateRequest, request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+
+    if not user.is_leader:
+        raise HTTPException(status_code=403, detail="오로지 관리자권한이 있는사람만 추가가능합니다.")
+
+    club_code = await get_leader_club_code(user.user_id, db)
+    return await dates_add(data, club_code, user, db)
+
+
 @router.post("/refresh_date")
 async def refresh(data: DateRequest,request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_db)):
     token = get_access_token_from_request(request, credentials)
@@ -192,21 +229,82 @@ async def delete_all_attendance(request: Request, credentials: Optional[HTTPAuth
 
 
 @router.get("/show_attendance/{date}")
-async def show_attendance(date, request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_db)):
+async def show_attendance(
+    date,
+    request: Request,
+    response: Response,
+    format: str = "rows",
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=ROSTER_PAGE_MAX),
+    columns: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
+    db: AsyncSession = Depends(get_read_db),
+):
     token = get_access_token_from_request(request, credentials)
     user = await get_current_user(token, db)
     if user.is_leader != True:
         raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    if format not in ("rows", "columnar"):
+        raise HTTPException(status_code=400, detail="지원하지 않는 형식입니다.")
+    club_code = await get_leader_club_code(user.user_id,db)
+    await use_primary_if_recent(db, club_code)
+    # 출석 데이터가 바뀌지 않았으면 출석부를 조회하지 않고 304
+    cached = await not_modified(request, response, club_code, ATTENDANCE, user.user_id)
+    if cached is not None:
+        return cached
     if date == "None": #날짜를 지정하지않음(전체 출석부 로드) 
-        club_code = await get_leader_club_code(user.user_id,db)
-        data, date_columns = await load_full_attendance(club_code, db)
-        return [data, date_columns]  # 날짜 리스트도 함께 반환
+        # from/to: 날짜 범위, cursor/limit: 이름순 회원 페이지, columns: 필요한 열만 (예: name,attended)
+        selected = parse_roster_columns(columns)
+        start = parse_attendance_date(date_from) if date_from else None
+        end = parse_attendance_date(date_to) if date_to else None
+        if start and end and start > end:
+            raise HTTPException(status_code=400, detail="시작 날짜가 종료 날짜보다 늦습니다.")
+        attendance = await load_attendance_matrix(
+            club_code, db, start, end, cursor, limit,
+            include_attendance="dates" in selected or "attended" in selected,
+        )
+        paged = limit is not None or cursor is not None
+        if format == "columnar": # 회원/날짜 목록과 비트로 압축한 출석 행
+            result = attendance.to_columnar(selected)
+            if paged:
+                result["next_cursor"] = attendance.next_cursor
+            return result
+        data = attendance.to_rows(selected)
+        if paged:
+            return {"rows": data, "dates": attendance.date_columns, "next_cursor": attendance.next_cursor}
+        return [data, attendance.date_columns]  # 날짜 리스트도 함께 반환
     else:
         data = await load_attendance(user, date, db)
         return data
 
 
 
+#회원별 출석 횟수/전체 횟수/최근 출석 (요약 테이블 조회)
+@router.get("/attendance_summary")
+async def show_attendance_summary(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_read_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+    if user.is_leader != True:
+        raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    club_code = await get_leader_club_code(user.user_id, db)
+    await use_primary_if_recent(db, club_code)
+    return await load_club_summaries(club_code, db)
+
+
+#회원별 출석률, 현재/최장 연속 출석, 최근 결석 여부
+@router.get("/attendance_analytics")
+async def show_attendance_analytics(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_read_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+    if user.is_leader != True:
+        raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    club_code = await get_leader_club_code(user.user_id, db)
+    await use_primary_if_recent(db, club_code)
+    return await load_club_analytics(club_code, db)
+
+
 @router.delete("/kick_user")
 async def kick_user(data: KickForm, request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_db)):
     token = get_access_token_from_request(request, credentials)
@@ -217,22 +315,143 @@ async def kick_user(data: KickForm, request: Request, credentials: Optional[HTTP
     await kick_user_from_club(data.user_id,club_code, db)
 
 #?묒??뚯씪濡?蹂??
+def _export_headers(club_code: str, format: str) -> dict:
+    return {"Content-Disposition": f"attachment; filename*=UTF-8''{export_filename(club_code, format)}"}
+
+
 @router.get("/export_attendance")
-async def export_attendance_excel(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security),db: AsyncSession = Depends(get_db)):
+async def export_attendance_excel(request: Request, format: str = "xlsx", credentials: Optional[HTTPAuthorizationCredentials] = Security(security),db: AsyncSession = Depends(get_read_db)):
     token = get_access_token_from_request(request, credentials)
     user = await get_current_user(token, db)
     if user.is_leader != True:
         raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="지원하지 않는 형식입니다.")
     club_code = await get_leader_club_code(user.user_id,db)
-    data, date_columns = await load_full_attendance(club_code, db)
-    output,encoded_filename = await export_excel(data,date_columns,club_code)
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
-        }
-    )
+    await use_primary_if_recent(db, club_code)
+    # 출석 데이터가 바뀌지 않았으면 이전에 만든 파일을 그대로 전송
+    try:
+        cached = await export_jobs.cached_file(club_code, format)
+    except Exception as e:
+        # 데이터 버전을 확인할 수 없으면 캐시 없이 새로 만들어 전송
+        admin_logger.error("[내보내기] 캐시 확인 실패 club=%s format=%s: %s", club_code, format, e)
+        cached = None
+    if cached:
+        return FileResponse(cached, media_type=EXPORT_MEDIA_TYPES[format], headers=_export_headers(club_code, format))
+    if format == "csv": # 분석용: 회원 덩어리 단위로 조회하면서 전송
+        body = stream_csv(club_code, session_factory_for(db))
+    elif format == "parquet":
+        require_parquet()
+        body = stream_parquet(club_code, session_factory_for(db))
+    else:
+        attendance = await load_attendance_matrix(club_code, db)
+        # 파일 생성은 작업 스레드에서 하고 시트를 다 쓴 뒤 압축되는 대로 전송
+        body = stream_excel(attendance)
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format], headers=_export_headers(club_code, format))
+
+
+#큰 동아리용: 백그라운드 작업으로 내보내기 파일 생성 후 상태 확인/다운로드
+@router.post("/export_jobs")
+async def submit_export_job(request: Request, format: str = "xlsx", credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+    if user.is_leader != True:
+        raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="지원하지 않는 형식입니다.")
+    if format == "parquet":
+        require_parquet()
+    club_code = await get_leader_club_code(user.user_id, db)
+    job = await export_jobs.submit(club_code, format)
+    return job.to_dict()
+
+
+@router.get("/export_jobs/{job_id}")
+async def get_export_job(job_id: str, request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+    if user.is_leader != True:
+        raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    club_code = await get_leader_club_code(user.user_id, db)
+    return (await export_jobs.get(job_id, club_code)).to_dict()
+
+
+@router.get("/export_jobs/{job_id}/download")
+async def download_export_job(job_id: str, request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+    if user.is_leader != True:
+        raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    club_code = await get_leader_club_code(user.user_id, db)
+    job = await export_jobs.get(job_id, club_code)
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail="아직 완료되지 않은 작업입니다.")
+    if not os.path.exists(job.path):
+        raise HTTPException(status_code=410, detail="내보내기 파일이 만료되었습니다. 다시 요청해주세요.")
+    return FileResponse(job.path, media_type=EXPORT_MEDIA_TYPES[job.format], headers=_export_headers(club_code, job.format))
+
+
+#학기가 끝나면 기준일 이전 출석 기록을 보관 테이블로 옮김 (현재 출석부·통계는 남은 기록만 사용)
+@router.post("/archives")
+async def archive_attendance(data: ArchiveRequest, request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+    if user.is_leader != True:
+        raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    club_code = await get_leader_club_code(user.user_id, db)
+    return await archive_club_attendance(club_code, data.before, data.label, user.user_id, db)
+
+
+@router.get("/archives")
+async def show_archives(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_read_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+    if user.is_leader != True:
+        raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    club_code = await get_leader_club_code(user.user_id, db)
+    await use_primary_if_recent(db, club_code)
+    return await list_archives(club_code, db)
+
+
+#모든 보관 기록을 합친 회원별 출석 합계
+@router.get("/archives/totals")
+async def show_archived_totals(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_read_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+    if user.is_leader != True:
+        raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    club_code = await get_leader_club_code(user.user_id, db)
+    await use_primary_if_recent(db, club_code)
+    return await load_club_archived_totals(club_code, db)
+
+
+@router.get("/archives/{archive_id}")
+async def show_archive(archive_id: int, request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_read_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+    if user.is_leader != True:
+        raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    club_code = await get_leader_club_code(user.user_id, db)
+    await use_primary_if_recent(db, club_code)
+    return await load_archive_totals(club_code, archive_id, db)
+
+
+@router.get("/archives/{archive_id}/export")
+async def export_archive(archive_id: int, request: Request, format: str = "xlsx", credentials: Optional[HTTPAuthorizationCredentials] = Security(security), db: AsyncSession = Depends(get_read_db)):
+    token = get_access_token_from_request(request, credentials)
+    user = await get_current_user(token, db)
+    if user.is_leader != True:
+        raise HTTPException(status_code=400, detail="허가되지 않은 사용자입니다.")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="지원하지 않는 형식입니다.")
+    if format == "parquet":
+        require_parquet()
+    club_code = await get_leader_club_code(user.user_id, db)
+    await use_primary_if_recent(db, club_code)
+    archive = await get_archive(club_code, archive_id, db)
+    attendance = await load_archive_matrix(archive, db)
+    headers = _export_headers(f"{club_code}_{archive.label}", format)
+    return StreamingResponse(stream_matrix(attendance, format), media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
 
 
 @router.get("/location_settings")
@@ -289,7 +508,7 @@ async def add_schedule(
 async def get_schedules(
     request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     token = get_access_token_from_request(request, credentials)
     user = await get_current_user(token, db)
@@ -297,6 +516,7 @@ async def get_schedules(
         raise HTTPException(status_code=403, detail="오로지 관리자권한이 있는사람만 조회가능합니다.")
 
     club_code = await get_leader_club_code(user.user_id, db)
+    await use_primary_if_recent(db, club_code)
     return await list_schedules_by_club(club_code, db)
 
 
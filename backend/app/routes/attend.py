@@ -1,17 +1,20 @@
-﻿from fastapi import APIRouter, Depends, Security, HTTPException, Request
+﻿from fastapi import APIRouter, Depends, Security, HTTPException, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import asyncio
 from fastapi_limiter.depends import RateLimiter
 
-from app.db import get_db
+from app.db import get_db, get_read_db, use_primary_if_recent
 from app.variable import *
 from app.services.service import *
 from app.services.club_service import *
 from app.services.attend_service import *
 # from app.services.location_service import validate_location
-from app.routes.admin import attendance_ws
+from app.services.checkin_buffer import record_check_in
+from app.services.attendance_summary import load_member_summary
+from app.services.attendance_archive import load_my_archived_totals
+from app.services.club_version import not_modified, ATTENDANCE
 from app.schema.attend_schema import *
 from app.schema.club_schema import *
 from app.logger import get_attendance_logger
@@ -32,24 +35,11 @@ async def check_attendance(
     db: AsyncSession = Depends(get_db)
 ):
     token = get_access_token_from_request(request, credentials)
-    user = await get_current_user(token, db)
-    await check_joining(user.user_id, data.club_code, db)
-    current = attendance_ws.attendance_codes.get(data.club_code)
-
-    if not current:
-        raise HTTPException(status_code=404, detail="출석 코드가 생성되어 있지 않습니다.")
+    user_id = get_token_user_id(token)
 
     expected_code = f"{data.club_code}:{data.code}"
-    valid_codes = current.get("valid_codes")
-
-    if expected_code not in valid_codes:
-        raise HTTPException(status_code=400, detail="출석 코드가 일치하지 않습니다.")
-
-
-    date = current["date"]
-    date_id = await get_date_id(date, data.club_code, db)
     # await validate_location(data.club_code, data.latitude, data.longitude, db)
-    await asyncio.gather(attend_date(user.user_id, date_id, db))
+    await record_check_in(user_id, data.club_code, expected_code, db)
 
     return {"message": "출석을 확인했습니다."}
 
@@ -62,7 +52,7 @@ async def check_qr_attendance(
     db: AsyncSession = Depends(get_db)
 ):
     token = get_access_token_from_request(request, credentials)
-    user = await get_current_user(token, db)
+    user_id = get_token_user_id(token)
 
     if ":" not in data.qr_code:
         raise HTTPException(status_code=400, detail="잘못된 QR코드 형식입니다")
@@ -72,21 +62,8 @@ async def check_qr_attendance(
     except ValueError:
         raise HTTPException(status_code=400, detail="잘못된 QR코드 형식입니다")
 
-    await check_joining(user.user_id, club_code, db)
-
-    current = attendance_ws.attendance_codes.get(club_code)
-    if not current:
-        raise HTTPException(status_code=404, detail="출석 코드가 생성되어 있지 않습니다.")
-
-    valid_codes = current.get("valid_codes")
-    if data.qr_code not in valid_codes:
-        raise HTTPException(status_code=400, detail="출석 코드가 일치하지 않습니다.")
-
-
-    date = current["date"]
-    date_id = await get_date_id(date, club_code, db)
     # await validate_location(club_code, data.latitude, data.longitude, db)
-    await asyncio.gather(attend_date(user.user_id, date_id, db))
+    await record_check_in(user_id, club_code, data.qr_code, db)
 
     return {"message": "출석을 확인했습니다."}
 
@@ -95,14 +72,57 @@ async def check_qr_attendance(
 async def load_attend(
     club_code: str,
     request: Request,
+    response: Response,
     credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     token = get_access_token_from_request(request, credentials)
     user = await get_current_user(token, db)
+    await use_primary_if_recent(db, club_code)
+    # 출석 데이터가 바뀌지 않았으면 조회 없이 304
+    cached = await not_modified(request, response, club_code, ATTENDANCE, user.user_id)
+    if cached is not None:
+        return cached
     return await load_myattend(club_code, user.user_id, db)
 
 
+#가입한 모든 동아리의 출석 기록
+@router.get("/history")
+async def load_history(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
+    db: AsyncSession = Depends(get_read_db)
+):
+    token = get_access_token_from_request(request, credentials)
+    user_id = get_token_user_id(token)
+    return await load_my_history(user_id, db)
+
+
+#보관된 학기별 본인 출석 합계
+@router.get("/archived_totals")
+async def load_archived_totals(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
+    db: AsyncSession = Depends(get_read_db)
+):
+    token = get_access_token_from_request(request, credentials)
+    user_id = get_token_user_id(token)
+    return await load_my_archived_totals(user_id, db)
+
+
+@router.get("/summary/{club_code}")
+async def load_my_summary(
+    club_code: str,
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
+    db: AsyncSession = Depends(get_db)
+):
+    token = get_access_token_from_request(request, credentials)
+    user_id = get_token_user_id(token)
+    await check_joining(user_id, club_code, db)
+    return await load_member_summary(club_code, user_id, db)
+
+
 @router.put("/attendance/bulk_update")
 async def bulk_update_attendance_api(
     req: AttendanceBulkUpdateRequest,
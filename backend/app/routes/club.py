@@ -1,13 +1,14 @@
-﻿from fastapi import APIRouter, Depends, Security, Request, HTTPException
+﻿from fastapi import APIRouter, Depends, Security, Request, Response, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import Optional
-from app.db import get_db
+from app.db import get_db, get_read_db, use_primary_if_recent
 from app.variable import *
 from app.schema.club_schema import *
 from app.services.club_service import *
-from app.services.schedule_service import list_member_schedules
+from app.services.schedule_service import list_schedules_by_club
+from app.services.club_version import not_modified, SCHEDULES
 from app.services.service import *
 from app.models import User, StuClub
 from app.schema.schedule_schema import ScheduleResponse
@@ -52,7 +53,7 @@ async def quit_club(
 async def get_club(
     request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     token = get_access_token_from_request(request, credentials)
     user = await get_current_user(token, db)
@@ -91,9 +92,16 @@ async def get_members(
 async def get_club_schedules(
     club_code: str,
     request: Request,
+    response: Response,
     credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     token = get_access_token_from_request(request, credentials)
     user = await get_current_user(token, db)
-    return await list_member_schedules(club_code, user.user_id, db)
+    await check_joining(user.user_id, club_code, db)
+    await use_primary_if_recent(db, club_code)
+    # 일정이 바뀌지 않았으면 조회 없이 304
+    cached = await not_modified(request, response, club_code, SCHEDULES)
+    if cached is not None:
+        return cached
+    return await list_schedules_by_club(club_code, db)
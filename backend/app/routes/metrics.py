@@ -0,0 +1,35 @@
+import hmac
+import os
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.db import engine, read_engine
+from app.db_pool import pool_metrics, pool_metrics_text
+
+# 설정하지 않으면 메트릭 엔드포인트를 열지 않음
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+router = APIRouter(
+    prefix="/metrics",
+)
+
+
+def _check_metrics_token(request: Request):
+    token = request.headers.get("x-metrics-token", "")
+    if not METRICS_TOKEN or not hmac.compare_digest(token, METRICS_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+#DB 커넥션 풀 상태 (format=prometheus면 Prometheus 텍스트 형식)
+@router.get("/db_pool")
+async def db_pool_metrics(request: Request, format: str = "json"):
+    _check_metrics_token(request)
+    metrics = pool_metrics(engine)
+    replica = pool_metrics(read_engine) if read_engine is not engine else None
+    if format == "prometheus":
+        text = pool_metrics_text(metrics)
+        if replica is not None:
+            text += pool_metrics_text(replica, "replica")
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+    if replica is not None:
+        metrics["replica"] = replica
+    return metrics
@@ -1,7 +1,7 @@
 ﻿from fastapi import APIRouter, Depends, Security, Request, Response, Cookie
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.db import get_db
+from app.db import get_db, get_read_db
 from app.variable import *
 from app.schema.user_schema import *
 from app.services.user_service import *
@@ -10,6 +10,10 @@ from app.logger import get_user_logger
 from app.utils.request_ip import get_client_ip
 
 from app.services.club_service import get_club_info
+from app.services.club_version import bump_club_version
+from app.services.attendance_summary import refresh_summaries, remove_summaries
+from app.services.session_store import attendance_store
+from app.services.session_hub import attendance_hub
 
 from fastapi import HTTPException
 import urllib.parse
@@ -19,6 +23,7 @@ import json
 import os
 import secrets
 import smtplib
+from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import Optional
 from email.message import EmailMessage
@@ -641,7 +646,7 @@ async def logout(
 async def get_mydata(
     request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     token = get_access_token_from_request(request, credentials)
     user = await get_current_user(token, db)
@@ -710,26 +715,30 @@ async def delete_account(
 
         from sqlalchemy import delete
         from app.models import RefreshToken, StuClub, Attendance, AttendanceDate, ConsentAgreement, User
+        from app.models import ArchivedAttendance, ArchivedMemberTotal
 
-        # 리더가 생성한 출석일이 있으면 관련 출석 레코드도 함께 정리
         from sqlalchemy import select
-        attendance_date_ids_result = await db.execute(
-            select(AttendanceDate.id).where(AttendanceDate.set_by == user.user_id)
-        )
-        attendance_date_ids = [row[0] for row in attendance_date_ids_result.fetchall()]
-
+        from app.services.bulk_delete import delete_in_batches
+
+        # 탈퇴 후 출석부가 바뀌는 동아리 (가입한 동아리, 직접 만든 출석일의 동아리)
+        joined_clubs = (await db.scalars(
+            select(StuClub.club_code).where(StuClub.user_id == user.user_id)
+        )).all()
+        created_dates = defaultdict(list)
+        for club_code, date_id in (await db.execute(
+            select(AttendanceDate.club_code, AttendanceDate.id).where(AttendanceDate.set_by == user.user_id)
+        )).all():
+            created_dates[club_code].append(date_id)
+
+        # 직접 만든 출석일로 출석이 진행 중이면 삭제 전에 종료
+        for club_code, date_ids in created_dates.items():
+            await attendance_hub.end_session(club_code, date_ids)
+
+        # 1) 본인 데이터는 한 트랜잭션으로 먼저 삭제 (이후 단계가 실패해도 동아리/출석에서는 이미 빠진 상태)
         await db.execute(
             delete(RefreshToken).where(RefreshToken.user_id == user.user_id)
         )
 
-        if attendance_date_ids:
-            await db.execute(
-                delete(Attendance).where(Attendance.attendance_date_id.in_(attendance_date_ids))
-            )
-            await db.execute(
-                delete(AttendanceDate).where(AttendanceDate.id.in_(attendance_date_ids))
-            )
-
         await db.execute(
             delete(Attendance).where(Attendance.user_id == user.user_id)
         )
@@ -738,15 +747,45 @@ async def delete_account(
             delete(StuClub).where(StuClub.user_id == user.user_id)
         )
 
+        # 보관된 학기 기록 중 본인 출석/합계도 삭제
         await db.execute(
-            delete(ConsentAgreement).where(ConsentAgreement.user_id == user.user_id)
+            delete(ArchivedAttendance).where(ArchivedAttendance.user_id == user.user_id)
         )
 
         await db.execute(
-            delete(User).where(User.user_id == user.user_id)
+            delete(ArchivedMemberTotal).where(ArchivedMemberTotal.user_id == user.user_id)
         )
 
+        await remove_summaries(db, user_id=user.user_id)
         await db.commit()
+        for club_code in joined_clubs:
+            await attendance_store.remove_member(club_code, user.user_id)
+            await bump_club_version(club_code)
+
+        # 2) 리더가 생성한 출석일과 그 출석 기록은 양이 많을 수 있으므로 배치마다 커밋하며 삭제
+        # (출석일이 계정을 참조하므로 계정보다 먼저 지우고, 중간에 실패해도 다시 탈퇴하면 남은 행부터 이어서 삭제됨)
+        try:
+            created_date_ids = select(AttendanceDate.id).where(AttendanceDate.set_by == user.user_id)
+            await delete_in_batches(db, Attendance, Attendance.attendance_date_id.in_(created_date_ids))
+            await delete_in_batches(db, AttendanceDate, AttendanceDate.set_by == user.user_id)
+
+            # 3) 출석일이 지워진 동아리의 남은 회원 요약 재계산과 계정 삭제
+            for club_code in created_dates:
+                await refresh_summaries(db, club_code)
+
+            await db.execute(
+                delete(ConsentAgreement).where(ConsentAgreement.user_id == user.user_id)
+            )
+
+            await db.execute(
+                delete(User).where(User.user_id == user.user_id)
+            )
+
+            await db.commit()
+        finally:
+            # 배치마다 커밋하므로 도중에 실패해도 출석부가 바뀌었을 수 있어 버전 갱신
+            for club_code in created_dates:
+                await bump_club_version(club_code)
         _clear_auth_cookies(response)
 
         return {"message": "회원탈퇴가 완료되었습니다."}
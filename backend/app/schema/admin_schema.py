@@ -1,11 +1,21 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class DateRequest(BaseModel):
     date: str
 
 
+#날짜 목록(dates) 또는 매주 반복 규칙(start~end, weekdays: 0=월 ~ 6=일, 기본은 start의 요일) 중 하나
+class BulkDateRequest(BaseModel):
+    dates: Optional[List[str]] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    weekdays: Optional[List[int]] = None
+    exclude: List[str] = []
+    skip_existing: bool = False
+
+
 class KickForm(BaseModel):
     user_id: str
 
@@ -15,3 +25,9 @@ class LocationSettingRequest(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     radius_km: Optional[float] = 0.1
+
+
+#before 이전 날짜의 출석 기록 보관 (label이 없으면 날짜 범위로 이름 지정)
+class ArchiveRequest(BaseModel):
+    before: str
+    label: Optional[str] = None
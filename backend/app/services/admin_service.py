@@ -2,15 +2,19 @@ from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import StreamingResponse
 from fastapi import HTTPException
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select, join, delete
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy import select, join, delete, insert, func
 from app.models import StuClub,Attendance,AttendanceDate,User
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.services.club_service import check_joining
+from app.services.attend_service import parse_attendance_date
+from app.services.session_store import attendance_store
+from app.services.session_hub import attendance_hub
+from app.services.attendance_matrix import load_attendance_matrix, DEFAULT_ROSTER_COLUMNS
+from app.services.club_version import bump_club_version
+from app.services.attendance_summary import add_session, refresh_summaries, remove_summaries
+from app.services.bulk_delete import delete_in_batches
 from app.db import get_db
-from urllib.parse import quote
-from io import BytesIO
-import pandas as pd
 
 #관리자 클럽코드 호출
 async def get_leader_club_code(user_id: str, db: AsyncSession) -> str:
@@ -71,7 +75,10 @@ async def kick_user_from_club(id: str,code:str ,db: AsyncSession):
     data = await check_joining(id,code,db)  
     try:
         await db.delete(data)
+        await remove_summaries(db, code, id)
         await db.commit()
+        await attendance_store.remove_member(code, id)
+        await bump_club_version(code)
         return 
     except SQLAlchemyError as e:
         await db.rollback()
@@ -84,31 +91,32 @@ async def delete_date_from_club(code: str, date: str, db: AsyncSession):
         raise HTTPException(status_code=400, detail="날짜 형식이 올바르지 않습니다. (예: YYYY-MM-DD)")
 
     try:
-        # 해당 날짜의 AttendanceDate 가져오기
-        result = await db.execute(
-            select(AttendanceDate).where(
+        # 해당 날짜의 AttendanceDate id 가져오기
+        attendance_date_id = await db.scalar(
+            select(AttendanceDate.id).where(
                 AttendanceDate.club_code == code,
                 AttendanceDate.date == target_date
             )
         )
-        attendance_date = result.scalars().first()
 
-        if not attendance_date:
+        if attendance_date_id is None:
             raise HTTPException(status_code=404, detail="해당 날짜가 존재하지 않습니다.")
 
-        attendance_date_id = attendance_date.id
-
+        # 삭제할 날짜로 출석이 진행 중이면 먼저 종료해 지워진 날짜로 출석이 들어오지 않게 함
+        await attendance_hub.end_session(code, [attendance_date_id])
+        # 날짜 하나의 출석 기록은 회원 수만큼이므로 한 트랜잭션으로 삭제 (실패하면 아무것도 지워지지 않음)
         # 1. Attendance 삭제
         await db.execute(
             delete(Attendance).where(Attendance.attendance_date_id == attendance_date_id)
         )
 
-        # 2. AttendanceDate 삭제
+        # 2. AttendanceDate 삭제 + 출석 요약 재계산
         await db.execute(
             delete(AttendanceDate).where(AttendanceDate.id == attendance_date_id)
         )
-
+        await refresh_summaries(db, code)
         await db.commit()
+        await bump_club_version(code)
         return {"message": f"{date} 날짜의 출석 기록이 성공적으로 삭제되었습니다."}
 
     except SQLAlchemyError:
@@ -116,28 +124,27 @@ async def delete_date_from_club(code: str, date: str, db: AsyncSession):
         raise HTTPException(status_code=500, detail="출석 삭제 중 데이터베이스 오류가 발생했습니다.")
 
 # 전체 출석 기록 삭제
+# 출석 기록 → 날짜 순서로 배치마다 커밋 (실패하면 다시 실행해서 이어서 삭제)
 async def delete_all_attendance_from_club(code: str, db: AsyncSession):
     try:
-        result = await db.execute(
-            select(AttendanceDate).where(AttendanceDate.club_code == code)
+        date_count = await db.scalar(
+            select(func.count()).select_from(AttendanceDate).where(AttendanceDate.club_code == code)
         )
-        attendance_dates = result.scalars().all()
 
-        if not attendance_dates:
+        if not date_count:
             raise HTTPException(status_code=404, detail="삭제할 출석 기록이 없습니다.")
 
-        attendance_date_ids = [ad.id for ad in attendance_dates]
-
-        await db.execute(
-            delete(Attendance).where(Attendance.attendance_date_id.in_(attendance_date_ids))
-        )
-
-        await db.execute(
-            delete(AttendanceDate).where(AttendanceDate.club_code == code)
-        )
-
-        await db.commit()
-        return {"message": f"전체 출석 기록이 성공적으로 삭제되었습니다. ({len(attendance_dates)}개 날짜)"}
+        await attendance_hub.end_session(code)
+        club_date_ids = select(AttendanceDate.id).where(AttendanceDate.club_code == code)
+        try:
+            await delete_in_batches(db, Attendance, Attendance.attendance_date_id.in_(club_date_ids))
+            await delete_in_batches(db, AttendanceDate, AttendanceDate.club_code == code)
+            await refresh_summaries(db, code)
+            await db.commit()
+        finally:
+            # 배치마다 커밋하므로 도중에 실패해도 출석부가 바뀌었을 수 있어 버전 갱신
+            await bump_club_version(code)
+        return {"message": f"전체 출석 기록이 성공적으로 삭제되었습니다. ({date_count}개 날짜)"}
 
     except SQLAlchemyError:
         await db.rollback()
@@ -168,63 +175,92 @@ async def date_add(data, club_code,user):
         #날짜 추가 
         new_date = AttendanceDate(club_code=club_code, date=date_obj, set_by=user.user_id)
         db.add(new_date)
+        await add_session(db, club_code)
 
         await db.commit()  
-# 출석부 전체로드
-async def load_full_attendance(club_code: str, db: AsyncSession):
-    date_result = await db.execute(
-        select(AttendanceDate.id, AttendanceDate.date)
-        .where(AttendanceDate.club_code == club_code)
-        .order_by(AttendanceDate.date)
-    )
-    dates = date_result.all()  
+        await bump_club_version(club_code)
+# 한 번에 추가할 수 있는 최대 날짜 수 (반복 규칙의 기간도 이 일수로 제한)
+MAX_BULK_DATES = 366
+# 동시에 같은 날짜가 추가돼 충돌했을 때 다시 확인하는 횟수 (skip_existing일 때)
+DATES_ADD_ATTEMPTS = 3
+
+
+def expand_bulk_dates(data) -> list:
+    if data.dates is not None:
+        if data.start or data.end or data.weekdays:
+            raise HTTPException(status_code=400, detail="날짜 목록과 반복 규칙은 함께 사용할 수 없습니다.")
+        dates = {parse_attendance_date(d) for d in data.dates}
+    else:
+        if not data.start or not data.end:
+            raise HTTPException(status_code=400, detail="날짜 목록 또는 시작/종료 날짜가 필요합니다.")
+        start, end = parse_attendance_date(data.start), parse_attendance_date(data.end)
+        if start > end:
+            raise HTTPException(status_code=400, detail="시작 날짜가 종료 날짜보다 늦습니다.")
+        if (end - start).days >= MAX_BULK_DATES:
+            raise HTTPException(status_code=400, detail=f"반복 기간은 최대 {MAX_BULK_DATES}일입니다.")
+        weekdays = set(data.weekdays) if data.weekdays else {start.weekday()}
+        if any(w < 0 or w > 6 for w in weekdays):
+            raise HTTPException(status_code=400, detail="요일은 0(월)부터 6(일)까지입니다.")
+        dates = {
+            day for day in (start + timedelta(days=i) for i in range((end - start).days + 1))
+            if day.weekday() in weekdays
+        }
+    dates -= {parse_attendance_date(d) for d in data.exclude}
+    if not dates:
+        raise HTTPException(status_code=400, detail="추가할 날짜가 없습니다.")
+    if len(dates) > MAX_BULK_DATES:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {MAX_BULK_DATES}개의 날짜만 추가할 수 있습니다.")
+    return sorted(dates)
+
+
+#여러 날짜를 한 트랜잭션으로 추가 (중복 확인 IN 조회 1번 + 여러 행 INSERT 1번)
+async def dates_add(data, club_code: str, user, db: AsyncSession) -> dict:
+    dates = expand_bulk_dates(data)
+    # 확인과 추가 사이에 다른 요청이 같은 날짜를 추가하면 unique_club_date 위반 → 다시 확인
+    for _ in range(DATES_ADD_ATTEMPTS):
+        existing_result = await db.execute(
+            select(AttendanceDate.date).where(
+                AttendanceDate.club_code == club_code,
+                AttendanceDate.date.in_(dates),
+            )
+        )
+        existing = set(existing_result.scalars())
+        if existing and not data.skip_existing:
+            raise HTTPException(
+                status_code=409,
+                detail=f"이미 등록된 날짜입니다: {', '.join(str(d) for d in sorted(existing))}",
+            )
 
-    user_result = await db.execute(
-        select(User.user_id, User.name)
-        .join(StuClub, StuClub.user_id == User.user_id)
-        .where(StuClub.club_code == club_code)
-        .where(User.is_leader == False)
-        .order_by(User.name)
-    )
-    users = user_result.all()  
+        new_dates = [d for d in dates if d not in existing]
+        if not new_dates:
+            break
+        try:
+            await db.execute(
+                insert(AttendanceDate).values([
+                    {"club_code": club_code, "date": d, "set_by": user.user_id}
+                    for d in new_dates
+                ])
+            )
+            await add_session(db, club_code, len(new_dates))
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            if not data.skip_existing:
+                raise HTTPException(status_code=409, detail="이미 등록된 날짜가 있습니다. 다시 확인해주세요.")
+            continue
+        await bump_club_version(club_code)
+        break
+    else:
+        raise HTTPException(status_code=409, detail="다른 요청과 날짜 추가가 겹쳤습니다. 잠시 후 다시 시도해주세요.")
+    return {
+        "added": [str(d) for d in new_dates],
+        "skipped": [str(d) for d in sorted(existing)],
+    }
 
-    attendance_result = await db.execute(
-        select(Attendance.user_id, Attendance.attendance_date_id, Attendance.status)
-        .join(AttendanceDate, Attendance.attendance_date_id == AttendanceDate.id)
-        .where(AttendanceDate.club_code == club_code)
+# 출석부 전체로드
+async def load_full_attendance(club_code: str, db: AsyncSession, date_from=None, date_to=None, columns=DEFAULT_ROSTER_COLUMNS):
+    attendance = await load_attendance_matrix(
+        club_code, db, date_from, date_to,
+        include_attendance="dates" in columns or "attended" in columns,
     )
-    att_map = {(r.user_id, r.attendance_date_id): r.status for r in attendance_result}
-
-
-    result = []
-    for user_id, name in users:
-        row = {"user_id": user_id, "name": name}
-        for date_id, date in dates:
-            status = att_map.get((user_id, date_id))
-            row[str(date)] = True if status else False
-        result.append(row)
-    
-    return result, [str(d[1]) for d in dates]  
-
-#엑셀로 파일변환  
-async def export_excel(data,date_columns,club_code):
-    df = pd.DataFrame(data[0:])
-    df = df.rename(columns={
-        "user_id": "아이디",
-        "name": "이름"
-    })
-
-    for col in date_columns:
-        df[col] = df[col].apply(lambda x: "O" if x else "X")
-
-    df["비고"] = df[date_columns].apply(lambda row: f"{(row == 'O').sum()} / {len(date_columns)}", axis=1)
-
-
-    df = df[["아이디", "이름"] + date_columns + ["비고"]]
-
-    filename = f"출석부_{club_code}.xlsx"
-    encoded_filename = quote(filename)
-    output = BytesIO()
-    df.to_excel(output, index=False)
-    output.seek(0)
-    return output,encoded_filename
+    return attendance.to_rows(columns), attendance.date_columns
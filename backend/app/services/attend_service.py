@@ -1,22 +1,29 @@
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-from sqlalchemy import select,delete
-from app.models import Attendance,AttendanceDate
+from sqlalchemy import select,delete,and_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models import Attendance,AttendanceDate,StuClub,User,Club
+from app.services.club_version import bump_club_version
+from app.services.session_store import attendance_store
+from app.services.attendance_summary import add_attended, refresh_summaries
 from datetime import datetime, date
 from zoneinfo import ZoneInfo
 
-# 출석날짜 연동
-async def get_date_id(date, club_code: str, db: AsyncSession) -> int:
-    # date가 문자열인 경우 date 객체로 변환
+# date가 문자열인 경우 date 객체로 변환
+def parse_attendance_date(date):
     if isinstance(date, str):
         try:
-            date_obj = datetime.strptime(date, "%Y-%m-%d").date()
+            return datetime.strptime(date, "%Y-%m-%d").date()
         except ValueError:
             raise HTTPException(status_code=400, detail="날짜 형식이 잘못되었습니다. (예: 2025-05-15)")
     # date가 이미 date 객체인 경우 그대로 사용
-    else:
-        date_obj = date
+    return date
+
+# 출석날짜 연동
+async def get_date_id(date, club_code: str, db: AsyncSession) -> int:
+    date_obj = parse_attendance_date(date)
 
     result = await db.execute(
         select(AttendanceDate).where(
@@ -38,57 +45,151 @@ async def attend_date(user_id: str, date_id, db: AsyncSession):
         )
     )
     existing_attendance = result.scalars().first()
+    club_code = await db.scalar(select(AttendanceDate.club_code).where(AttendanceDate.id == date_id))
 
+    if existing_attendance and existing_attendance.status is True:
+        raise HTTPException(status_code=409, detail="이미 출석이 등록되었습니다.")
+    await add_attended(db, [(club_code, user_id, date_id, None)])
     if existing_attendance:
-        if existing_attendance.status is True:
-            raise HTTPException(status_code=409, detail="이미 출석이 등록되었습니다.")
         existing_attendance.status = True
-        await db.commit()
-        return
+    else:
+        new_attendance = Attendance(
+            user_id=user_id,
+            attendance_date_id=date_id,
+            status=True,
+        )
+        db.add(new_attendance)
+    await db.commit()
+    await bump_club_version(club_code)
 
-    new_attendance = Attendance(
-        user_id=user_id,
-        attendance_date_id=date_id,
-        status=True,
+# 출석 세션 시작 시 회원 명단({user_id: 이름})과 이미 출석한 회원 로드
+# 기존 출석 확인과 같이 동아리 가입 여부만 봄
+async def load_session_roster(club_code: str, date_id: int, db: AsyncSession):
+    members_result = await db.execute(
+        select(User.user_id, User.name)
+        .join(StuClub, StuClub.user_id == User.user_id)
+        .where(StuClub.club_code == club_code)
     )
-    db.add(new_attendance)
+    members = {r.user_id: r.name for r in members_result}
+    attended_result = await db.execute(
+        select(Attendance.user_id).where(
+            Attendance.attendance_date_id == date_id,
+            Attendance.status == True
+        )
+    )
+    attended = [user_id for user_id in attended_result.scalars() if user_id in members]
+    return members, attended
+
+# 출석 upsert 문 (운영은 MySQL, 벤치마크는 SQLite에서도 실행)
+def attendance_upsert(db: AsyncSession, rows):
+    if db.get_bind().dialect.name == "sqlite":
+        stmt = sqlite_insert(Attendance).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=["user_id", "attendance_date_id"],
+            set_={"status": stmt.excluded.status},
+        )
+    stmt = mysql_insert(Attendance).values(rows)
+    return stmt.on_duplicate_key_update(status=stmt.inserted.status)
+
+# 세션에서 검증된 출석 저장 (요약 갱신 + 출석 upsert를 한 트랜잭션으로)
+async def save_check_in(user_id: str, date_id: int, club_code: str, db: AsyncSession):
+    await add_attended(db, [(club_code, user_id, date_id, None)])
+    await db.execute(attendance_upsert(db, [{
+        "user_id": user_id,
+        "attendance_date_id": date_id,
+        "status": True,
+    }]))
     await db.commit()
+    await bump_club_version(club_code)
+
+# 날짜별 내 출석 여부 (기록이 없으면 status는 None)
 async def load_myattend(club_code, user_id: str, db: AsyncSession):
     result = await db.execute(
-        select(AttendanceDate)
+        select(AttendanceDate.date, Attendance.status)
+        .outerjoin(Attendance, and_(
+            Attendance.attendance_date_id == AttendanceDate.id,
+            Attendance.user_id == user_id,
+        ))
         .where(AttendanceDate.club_code == club_code)
+        .order_by(AttendanceDate.date)
     )
-    dates = result.scalars().all()
-    
-    attendances = []
-    for attendance_date in dates:
-        attendance_result = await db.execute(
-            select(Attendance)
-            .where(Attendance.attendance_date_id == attendance_date.id, Attendance.user_id == user_id)
-        )
-        attendance = attendance_result.scalar_one_or_none()
-        if attendance:
-            attendances.append({
-                "date": attendance_date.date,
-                "status": attendance.status})
-        else:
-            attendances.append({
-                "date": attendance_date.date,
-                "status": None
-            })
-    
-    return attendances
+    return [{"date": r.date, "status": r.status} for r in result]
+
+#가입한 모든 동아리의 출석 기록을 한 번에 조회 (동아리 순서는 get_club_info와 같음)
+async def load_my_history(user_id: str, db: AsyncSession):
+    result = await db.execute(
+        select(StuClub.club_code, Club.club_name, AttendanceDate.date, Attendance.status)
+        .join(Club, StuClub.club_code == Club.club_code)
+        .outerjoin(AttendanceDate, AttendanceDate.club_code == StuClub.club_code)
+        .outerjoin(Attendance, and_(
+            Attendance.attendance_date_id == AttendanceDate.id,
+            Attendance.user_id == StuClub.user_id,
+        ))
+        .where(StuClub.user_id == user_id)
+        .order_by(StuClub.id, AttendanceDate.date)
+    )
+    history = {}
+    for r in result:
+        club = history.get(r.club_code)
+        if club is None:
+            club = history[r.club_code] = {"club_code": r.club_code, "club_name": r.club_name, "attendances": []}
+        # 출석 날짜가 하나도 없는 동아리는 빈 목록
+        if r.date is not None:
+            club["attendances"].append({"date": r.date, "status": r.status})
+    return list(history.values())
 
+#요청한 목록을 그 날짜의 최종 출석 상태로 반영 (현재 기록과 비교해 바뀐 행만 upsert, 목록에 없는 회원은 삭제)
 async def bulk_update_attendance(attendance_date_id: int, attendances: list, db):
-    await db.execute(
-        delete(Attendance).where(Attendance.attendance_date_id == attendance_date_id)
+    club_code = await db.scalar(
+        select(AttendanceDate.club_code).where(AttendanceDate.id == attendance_date_id)
     )
-    for item in attendances:
-        new_attendance = Attendance(
-            user_id=item.user_id,
-            attendance_date_id=attendance_date_id,
-            status=item.status  
+    if club_code is None:
+        raise HTTPException(status_code=404, detail="출석 날짜를 찾을 수 없습니다.")
+
+    # 비교하는 동안 실시간 출석이 끼어들지 않도록 해당 날짜의 행을 잠금
+    current_result = await db.execute(
+        select(Attendance.user_id, Attendance.status)
+        .where(Attendance.attendance_date_id == attendance_date_id)
+        .with_for_update()
+    )
+    current = {r.user_id: r.status for r in current_result}
+    desired = {item.user_id: item.status for item in attendances}
+
+    inserted = [user_id for user_id in desired if user_id not in current]
+    updated = [user_id for user_id in desired if user_id in current and current[user_id] != desired[user_id]]
+    removed = [user_id for user_id in current if user_id not in desired]
+    unchanged = len(desired) - len(inserted) - len(updated)
+
+    changed = inserted + updated
+    if changed:
+        # 기존 행은 상태만 바뀌고 출석 시각은 유지됨
+        await db.execute(attendance_upsert(db, [
+            {"user_id": user_id, "attendance_date_id": attendance_date_id, "status": desired[user_id]}
+            for user_id in changed
+        ]))
+    if removed:
+        await db.execute(
+            delete(Attendance).where(
+                Attendance.attendance_date_id == attendance_date_id,
+                Attendance.user_id.in_(removed),
+            )
         )
-        db.add(new_attendance)
+    if changed or removed:
+        await refresh_summaries(db, club_code, changed + removed)
     await db.commit()
-    return {"message": "출석 정보가 업데이트되었습니다."}
\ No newline at end of file
+    if changed or removed:
+        # 같은 날짜 출석이 진행 중이면 바뀐 회원의 중복 출석 확인도 출석부와 맞춤
+        await attendance_store.sync_attended(
+            club_code,
+            attendance_date_id,
+            attended=[user_id for user_id in changed if desired[user_id]],
+            absent=[user_id for user_id in changed if not desired[user_id]] + removed,
+        )
+        await bump_club_version(club_code)
+    return {
+        "message": "출석 정보가 업데이트되었습니다.",
+        "inserted": len(inserted),
+        "updated": len(updated),
+        "unchanged": unchanged,
+        "deleted": len(removed),
+    }
@@ -0,0 +1,209 @@
+import os
+import sqlite3
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy import select, func, case, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Attendance, AttendanceDate, StuClub, User
+from app.services.attendance_matrix import load_attendance_matrix
+from app.services.club_version import club_versions
+from app.services.attendance_summary import attendance_today
+from app.logger import get_admin_logger
+
+logger = get_admin_logger()
+
+# 최근 ANALYTICS_RECENT_SESSIONS회 중 ANALYTICS_ABSENCE_THRESHOLD회 이상 결석하면 recent_absence
+ANALYTICS_RECENT_SESSIONS = int(os.getenv("ANALYTICS_RECENT_SESSIONS", "3"))
+ANALYTICS_ABSENCE_THRESHOLD = int(os.getenv("ANALYTICS_ABSENCE_THRESHOLD", "2"))
+# sql: 윈도 함수 / numpy: 출석 행렬 계산 / auto: DB가 윈도 함수를 지원하면 sql
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "auto")
+ANALYTICS_CACHE_CLUBS = int(os.getenv("ANALYTICS_CACHE_CLUBS", "256"))
+
+
+def _supports_window_functions(dialect) -> bool:
+    if dialect.name == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 25)
+    if dialect.name in ("mysql", "mariadb"):
+        version = dialect.server_version_info or ()
+        if getattr(dialect, "is_mariadb", False):
+            return version >= (10, 2)
+        return version >= (8, 0)
+    return True
+
+
+def _member_dict(user_id, name, attended, total, current, longest, recent) -> dict:
+    return {
+        "user_id": user_id,
+        "name": name,
+        "attended": attended,
+        "total": total,
+        "rate": round(attended / total, 4) if total else 0.0,
+        "current_streak": current,
+        "longest_streak": longest,
+        "recent_absences": recent,
+        "recent_absence": recent >= ANALYTICS_ABSENCE_THRESHOLD,
+    }
+
+
+# 회원마다 날짜 순 번호(rn)를 매기고, 연속 출석 구간(rn - 출석 행 번호가 같은 묶음)을 모아 계산
+async def _analytics_sql(club_code: str, today, db: AsyncSession) -> list:
+    present = case((Attendance.id.is_not(None), 1), else_=0)
+    marks = (
+        select(
+            StuClub.user_id.label("user_id"),
+            present.label("present"),
+            func.row_number().over(partition_by=StuClub.user_id, order_by=AttendanceDate.date).label("rn"),
+            func.count().over(partition_by=StuClub.user_id).label("n"),
+        )
+        .select_from(StuClub)
+        .join(AttendanceDate, AttendanceDate.club_code == StuClub.club_code)
+        .outerjoin(Attendance, and_(
+            Attendance.attendance_date_id == AttendanceDate.id,
+            Attendance.user_id == StuClub.user_id,
+            Attendance.status == True,
+        ))
+        .where(StuClub.club_code == club_code, AttendanceDate.date <= today)
+        .subquery()
+    )
+    islands = select(
+        marks.c.user_id,
+        marks.c.present,
+        marks.c.rn,
+        marks.c.n,
+        (marks.c.rn - func.row_number().over(
+            partition_by=(marks.c.user_id, marks.c.present), order_by=marks.c.rn,
+        )).label("grp"),
+    ).subquery()
+    runs = (
+        select(
+            islands.c.user_id,
+            func.count().label("length"),
+            func.max(islands.c.rn).label("end_rn"),
+            func.max(islands.c.n).label("n"),
+        )
+        .where(islands.c.present == 1)
+        .group_by(islands.c.user_id, islands.c.grp)
+        .subquery()
+    )
+    streaks = (
+        select(
+            runs.c.user_id,
+            func.max(runs.c.length).label("longest"),
+            # 가장 최근 날짜에서 끝나는 구간이 현재 연속 출석
+            func.max(case((runs.c.end_rn == runs.c.n, runs.c.length), else_=0)).label("current"),
+        )
+        .group_by(runs.c.user_id)
+        .subquery()
+    )
+    totals = (
+        select(
+            marks.c.user_id,
+            func.sum(marks.c.present).label("attended"),
+            func.max(marks.c.n).label("total"),
+            func.sum(case(
+                (marks.c.rn > marks.c.n - ANALYTICS_RECENT_SESSIONS, 1 - marks.c.present), else_=0,
+            )).label("recent"),
+        )
+        .group_by(marks.c.user_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(
+            User.user_id,
+            User.name,
+            func.coalesce(totals.c.attended, 0),
+            func.coalesce(totals.c.total, 0),
+            func.coalesce(streaks.c.current, 0),
+            func.coalesce(streaks.c.longest, 0),
+            func.coalesce(totals.c.recent, 0),
+        )
+        .select_from(StuClub)
+        .join(User, User.user_id == StuClub.user_id)
+        .outerjoin(totals, totals.c.user_id == StuClub.user_id)
+        .outerjoin(streaks, streaks.c.user_id == StuClub.user_id)
+        .where(StuClub.club_code == club_code, User.is_leader == False)
+        .order_by(User.name, User.user_id)
+    )
+    return [_member_dict(r[0], r[1], *map(int, r[2:])) for r in result]
+
+
+# 윈도 함수가 없는 DB용: 출석 행렬에서 연속 구간의 시작/끝 위치를 한 번에 구함
+async def _analytics_numpy(club_code: str, today, db: AsyncSession) -> list:
+    attendance = await load_attendance_matrix(club_code, db, date_to=today)
+    matrix = attendance.matrix
+    members, total = matrix.shape
+
+    padded = np.zeros((members, total + 2), dtype=np.int8)
+    padded[:, 1:-1] = matrix
+    edges = np.diff(padded, axis=1)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    _, end_cols = np.nonzero(edges == -1)
+    lengths = end_cols - start_cols
+
+    longest = np.zeros(members, dtype=np.int64)
+    np.maximum.at(longest, start_rows, lengths)
+    current = np.zeros(members, dtype=np.int64)
+    ending = end_cols == total
+    current[start_rows[ending]] = lengths[ending]
+
+    attended = matrix.sum(axis=1)
+    recent = (~matrix[:, max(total - ANALYTICS_RECENT_SESSIONS, 0):]).sum(axis=1)
+    return [
+        _member_dict(user_id, name, int(a), total, int(c), int(l), int(r))
+        for user_id, name, a, c, l, r in zip(
+            attendance.user_ids, attendance.names, attended, current, longest, recent,
+        )
+    ]
+
+
+#동아리 데이터 버전과 날짜가 같으면 이전 계산 결과를 재사용 (워커별 LRU)
+class AnalyticsCache:
+    def __init__(self, max_clubs: int = ANALYTICS_CACHE_CLUBS):
+        self.max_clubs = max_clubs
+        self.entries = OrderedDict()
+
+    def get(self, club_code: str, key):
+        entry = self.entries.get(club_code)
+        if entry is None or entry[0] != key:
+            return None
+        self.entries.move_to_end(club_code)
+        return entry[1]
+
+    def put(self, club_code: str, key, value):
+        self.entries[club_code] = (key, value)
+        self.entries.move_to_end(club_code)
+        while len(self.entries) > self.max_clubs:
+            self.entries.popitem(last=False)
+
+
+analytics_cache = AnalyticsCache()
+
+
+#회원별 출석률, 현재/최장 연속 출석, 최근 결석 (아직 지나지 않은 날짜는 제외)
+async def load_club_analytics(club_code: str, db: AsyncSession) -> dict:
+    today = attendance_today()
+    try:
+        version = await club_versions.get(club_code)
+    except Exception as e:
+        logger.error("[출석통계] 데이터 버전 조회 실패 club=%s: %s", club_code, e)
+        version = None
+
+    key = (version, today)
+    members = analytics_cache.get(club_code, key) if version is not None else None
+    if members is None:
+        engine = ANALYTICS_ENGINE
+        if engine == "auto":
+            engine = "sql" if _supports_window_functions(db.get_bind().dialect) else "numpy"
+        if engine == "sql":
+            members = await _analytics_sql(club_code, today, db)
+        else:
+            members = await _analytics_numpy(club_code, today, db)
+        if version is not None:
+            analytics_cache.put(club_code, key, members)
+
+    return {
+        "as_of": str(today),
+        "recent_sessions": ANALYTICS_RECENT_SESSIONS,
+        "absence_threshold": ANALYTICS_ABSENCE_THRESHOLD,
+        "members": members,
+    }
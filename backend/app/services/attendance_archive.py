@@ -0,0 +1,311 @@
+# 학기별 출석 기록 보관
+# 기준일 이전 출석 날짜/기록을 보관 테이블(archived_*)로 옮기고 회원별 합계를 남김
+# 출석부·통계·내보내기 등 평소 조회는 현재 학기 기록만 읽고, 보관된 기록은 요청할 때만 조회/내보내기
+#   python -m app.services.attendance_archive archive --club CODE --before YYYY-MM-DD [--label 2025-2학기]
+#   python -m app.services.attendance_archive list --club CODE
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from fastapi import HTTPException
+from sqlalchemy import select, insert, func, and_, literal
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import (
+    Attendance,
+    AttendanceDate,
+    AttendanceArchive,
+    ArchivedAttendance,
+    ArchivedAttendanceDate,
+    ArchivedMemberTotal,
+    Club,
+    StuClub,
+    User,
+)
+from app.services.attend_service import parse_attendance_date
+from app.services.attendance_matrix import AttendanceMatrix, build_attendance_matrix
+from app.services.attendance_summary import refresh_summaries
+from app.services.bulk_delete import delete_in_batches
+from app.services.club_version import bump_club_version
+from app.services.session_hub import attendance_hub
+from app.logger import get_admin_logger
+
+logger = get_admin_logger()
+
+ARCHIVE_TIMEZONE = ZoneInfo(os.getenv("ARCHIVE_TIMEZONE", "Asia/Seoul"))
+ARCHIVE_LABEL_MAX = 100
+
+
+def _archive_dict(archive: AttendanceArchive) -> dict:
+    return {
+        "id": archive.id,
+        "label": archive.label,
+        "date_from": str(archive.date_from),
+        "date_to": str(archive.date_to),
+        "date_count": archive.date_count,
+        "record_count": archive.record_count,
+        "created_by": archive.created_by,
+        "created_at": archive.created_at,
+    }
+
+
+def _total_dict(r) -> dict:
+    return {
+        "user_id": r.user_id,
+        "name": r.name,
+        "attended": r.attended_count,
+        "total": r.total_sessions,
+        "rate": round(r.attended_count / r.total_sessions, 4) if r.total_sessions else 0.0,
+        "last_attended_at": r.last_attended_at,
+    }
+
+
+#보관 테이블에 이미 복사된 날짜를 출석 테이블에서 배치로 삭제 (중단된 보관 작업도 이어서 정리)
+async def _purge_archived(db: AsyncSession, club_code: str) -> int:
+    archived_ids = select(ArchivedAttendanceDate.id).where(ArchivedAttendanceDate.club_code == club_code)
+    hot_ids = select(AttendanceDate.id).where(
+        AttendanceDate.club_code == club_code,
+        AttendanceDate.id.in_(archived_ids),
+    )
+    deleted = await delete_in_batches(db, Attendance, Attendance.attendance_date_id.in_(hot_ids))
+    deleted += await delete_in_batches(db, AttendanceDate, AttendanceDate.club_code == club_code, AttendanceDate.id.in_(archived_ids))
+    return deleted
+
+
+#before 이전 날짜의 출석 기록을 보관 (before는 오늘 이전만 가능하므로 진행 중인 출석은 옮기지 않음)
+# 1) 날짜·기록·회원별 합계 복사 후 커밋 → 2) 출석 테이블에서 배치 삭제 → 3) 요약 재계산
+async def archive_club_attendance(club_code: str, before, label: str, user_id: str, db: AsyncSession) -> dict:
+    cutoff = parse_attendance_date(before)
+    if cutoff > datetime.now(ARCHIVE_TIMEZONE).date():
+        raise HTTPException(status_code=400, detail="기준일은 오늘 이후로 지정할 수 없습니다.")
+    label = (label or "").strip()
+    if len(label) > ARCHIVE_LABEL_MAX:
+        raise HTTPException(status_code=400, detail=f"보관 이름은 {ARCHIVE_LABEL_MAX}자 이하로 입력해주세요.")
+
+    try:
+        # 이전 보관 작업이 정리 도중 중단됐으면 마저 정리
+        if await _purge_archived(db, club_code):
+            await refresh_summaries(db, club_code)
+            await db.commit()
+            await bump_club_version(club_code)
+
+        in_range = (AttendanceDate.club_code == club_code, AttendanceDate.date < cutoff)
+        date_count, date_from, date_to = (await db.execute(
+            select(func.count(), func.min(AttendanceDate.date), func.max(AttendanceDate.date)).where(*in_range)
+        )).one()
+        if not date_count:
+            raise HTTPException(status_code=404, detail="보관할 출석 기록이 없습니다.")
+
+        archive = AttendanceArchive(
+            club_code=club_code,
+            label=label or f"{date_from} ~ {date_to}",
+            date_from=date_from,
+            date_to=date_to,
+            date_count=date_count,
+            created_by=user_id,
+        )
+        db.add(archive)
+        await db.flush()
+        archive_id = literal(archive.id)
+
+        await db.execute(insert(ArchivedAttendanceDate).from_select(
+            ["id", "archive_id", "club_code", "date", "set_by"],
+            select(AttendanceDate.id, archive_id, AttendanceDate.club_code, AttendanceDate.date, AttendanceDate.set_by)
+            .where(*in_range),
+        ))
+        date_ids = select(AttendanceDate.id).where(*in_range)
+        await db.execute(insert(ArchivedAttendance).from_select(
+            ["id", "archive_id", "user_id", "attendance_date_id", "status", "timestamp"],
+            select(
+                Attendance.id, archive_id, Attendance.user_id,
+                Attendance.attendance_date_id, Attendance.status, Attendance.timestamp,
+            )
+            .where(Attendance.attendance_date_id.in_(date_ids)),
+        ))
+        # 보관 시점 회원(리더 제외)의 기간 내 출석 합계
+        await db.execute(insert(ArchivedMemberTotal).from_select(
+            ["archive_id", "club_code", "user_id", "name", "attended_count", "total_sessions", "last_attended_at"],
+            select(
+                archive_id,
+                StuClub.club_code,
+                StuClub.user_id,
+                User.name,
+                func.count(func.distinct(Attendance.id)),
+                literal(date_count),
+                func.max(Attendance.timestamp),
+            )
+            .select_from(StuClub)
+            .join(User, User.user_id == StuClub.user_id)
+            .outerjoin(AttendanceDate, and_(AttendanceDate.club_code == StuClub.club_code, AttendanceDate.date < cutoff))
+            .outerjoin(Attendance, and_(
+                Attendance.attendance_date_id == AttendanceDate.id,
+                Attendance.user_id == StuClub.user_id,
+                Attendance.status == True,
+            ))
+            .where(StuClub.club_code == club_code, User.is_leader == False)
+            .group_by(StuClub.club_code, StuClub.user_id, User.name)
+        ))
+        archive.record_count = await db.scalar(
+            select(func.count()).select_from(ArchivedAttendance).where(ArchivedAttendance.archive_id == archive.id)
+        )
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="이미 진행 중인 보관 작업이 있습니다. 잠시 후 다시 시도해주세요.")
+    except SQLAlchemyError:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="출석 기록 보관 중 데이터베이스 오류가 발생했습니다.")
+
+    try:
+        # 보관한 날짜로 출석이 진행 중이면 출석 테이블에서 지우기 전에 종료
+        archived_date_ids = (await db.scalars(
+            select(ArchivedAttendanceDate.id).where(ArchivedAttendanceDate.archive_id == archive.id)
+        )).all()
+        await attendance_hub.end_session(club_code, archived_date_ids)
+        try:
+            await _purge_archived(db, club_code)
+            await refresh_summaries(db, club_code)
+            await db.commit()
+        finally:
+            await bump_club_version(club_code)
+    except SQLAlchemyError:
+        await db.rollback()
+        # 복사는 끝났으므로 다시 보관을 요청하면 남은 행부터 정리됨
+        logger.error("[출석보관] 출석 테이블 정리 실패 club=%s archive=%s", club_code, archive.id)
+        raise HTTPException(status_code=500, detail="보관한 출석 기록 정리 중 오류가 발생했습니다. 다시 시도해주세요.")
+
+    logger.info("[출석보관] club=%s archive=%s 날짜 %s개, 기록 %s건", club_code, archive.id, archive.date_count, archive.record_count)
+    return _archive_dict(archive)
+
+
+async def list_archives(club_code: str, db: AsyncSession) -> list:
+    result = await db.execute(
+        select(AttendanceArchive)
+        .where(AttendanceArchive.club_code == club_code)
+        .order_by(AttendanceArchive.date_from)
+    )
+    return [_archive_dict(a) for a in result.scalars()]
+
+
+async def get_archive(club_code: str, archive_id: int, db: AsyncSession) -> AttendanceArchive:
+    archive = await db.scalar(
+        select(AttendanceArchive).where(AttendanceArchive.id == archive_id, AttendanceArchive.club_code == club_code)
+    )
+    if archive is None:
+        raise HTTPException(status_code=404, detail="보관된 출석 기록이 존재하지 않습니다.")
+    return archive
+
+
+#보관 정보 + 회원별 출석 합계
+async def load_archive_totals(club_code: str, archive_id: int, db: AsyncSession) -> dict:
+    archive = await get_archive(club_code, archive_id, db)
+    result = await db.execute(
+        select(ArchivedMemberTotal)
+        .where(ArchivedMemberTotal.archive_id == archive.id)
+        .order_by(ArchivedMemberTotal.name, ArchivedMemberTotal.user_id)
+    )
+    return {**_archive_dict(archive), "members": [_total_dict(r) for r in result.scalars()]}
+
+
+#모든 보관 기록을 합친 회원별 출석 합계
+async def load_club_archived_totals(club_code: str, db: AsyncSession) -> list:
+    result = await db.execute(
+        select(
+            ArchivedMemberTotal.user_id,
+            func.max(ArchivedMemberTotal.name).label("name"),
+            func.sum(ArchivedMemberTotal.attended_count).label("attended_count"),
+            func.sum(ArchivedMemberTotal.total_sessions).label("total_sessions"),
+            func.max(ArchivedMemberTotal.last_attended_at).label("last_attended_at"),
+        )
+        .where(ArchivedMemberTotal.club_code == club_code)
+        .group_by(ArchivedMemberTotal.user_id)
+        .order_by(func.max(ArchivedMemberTotal.name), ArchivedMemberTotal.user_id)
+    )
+    return [_total_dict(r) for r in result]
+
+
+#회원 본인의 보관된 학기별 출석 합계
+async def load_my_archived_totals(user_id: str, db: AsyncSession) -> list:
+    result = await db.execute(
+        select(
+            AttendanceArchive.club_code,
+            Club.club_name,
+            AttendanceArchive.label,
+            AttendanceArchive.date_from,
+            AttendanceArchive.date_to,
+            ArchivedMemberTotal.attended_count,
+            ArchivedMemberTotal.total_sessions,
+        )
+        .join(AttendanceArchive, AttendanceArchive.id == ArchivedMemberTotal.archive_id)
+        .outerjoin(Club, Club.club_code == AttendanceArchive.club_code)
+        .where(ArchivedMemberTotal.user_id == user_id)
+        .order_by(AttendanceArchive.club_code, AttendanceArchive.date_from)
+    )
+    return [
+        {
+            "club_code": r.club_code,
+            "club_name": r.club_name,
+            "label": r.label,
+            "date_from": str(r.date_from),
+            "date_to": str(r.date_to),
+            "attended": r.attended_count,
+            "total": r.total_sessions,
+            "rate": round(r.attended_count / r.total_sessions, 4) if r.total_sessions else 0.0,
+        }
+        for r in result
+    ]
+
+
+#보관된 출석부를 내보내기용 행렬로 (회원은 보관 시점 명단 기준)
+async def load_archive_matrix(archive: AttendanceArchive, db: AsyncSession) -> AttendanceMatrix:
+    members = (await db.execute(
+        select(ArchivedMemberTotal.user_id, ArchivedMemberTotal.name)
+        .where(ArchivedMemberTotal.archive_id == archive.id)
+        .order_by(ArchivedMemberTotal.name, ArchivedMemberTotal.user_id)
+    )).all()
+    dates = (await db.execute(
+        select(ArchivedAttendanceDate.id, ArchivedAttendanceDate.date)
+        .where(ArchivedAttendanceDate.archive_id == archive.id)
+        .order_by(ArchivedAttendanceDate.date)
+    )).all()
+    attended = (await db.execute(
+        select(ArchivedAttendance.user_id, ArchivedAttendance.attendance_date_id)
+        .where(ArchivedAttendance.archive_id == archive.id, ArchivedAttendance.status == True)
+    )).all()
+    return build_attendance_matrix(members, dates, attended)
+
+
+async def _main(argv=None):
+    import argparse
+    from app.db import AsyncSessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="학기별 출석 기록 보관")
+    parser.add_argument("command", choices=["archive", "list"])
+    parser.add_argument("--club", required=True, help="동아리 코드")
+    parser.add_argument("--before", help="이 날짜 이전 기록을 보관 (YYYY-MM-DD)")
+    parser.add_argument("--label", default="", help="보관 이름 (기본: 날짜 범위)")
+    args = parser.parse_args(argv)
+    if args.command == "archive" and not args.before:
+        parser.error("archive에는 --before가 필요합니다.")
+
+    try:
+        async with AsyncSessionLocal() as db:
+            if args.command == "archive":
+                try:
+                    archive = await archive_club_attendance(args.club, args.before, args.label, None, db)
+                except HTTPException as e:
+                    print(f"[출석보관] 실패: {e.detail}")
+                    return 1
+                print(f"[출석보관] 완료: {archive}")
+                return 0
+            for archive in await list_archives(args.club, db):
+                print(archive)
+        return 0
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    sys.exit(asyncio.run(_main()))
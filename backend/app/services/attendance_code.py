@@ -0,0 +1,85 @@
+import hashlib
+import hmac
+import os
+import random
+import time
+from typing import Optional
+from app.services.session_store import attendance_store, VALID_CODE_WINDOW
+
+# random: 저장된 코드 목록과 비교 / totp: 시간 구간으로 계산한 코드와 비교
+ATTENDANCE_CODE_MODE = os.getenv("ATTENDANCE_CODE_MODE", "random").lower()
+ATTENDANCE_CODE_STEP_SECONDS = int(os.getenv("ATTENDANCE_CODE_STEP_SECONDS", "13"))
+
+
+def is_totp_mode() -> bool:
+    return ATTENDANCE_CODE_MODE == "totp"
+
+
+def generate_random_code() -> str:
+    random_number = random.randint(100, 999)
+    return f"{random_number}"
+
+
+def current_step(now: float = None) -> int:
+    if now is None:
+        now = time.time()
+    return int(now // ATTENDANCE_CODE_STEP_SECONDS)
+
+
+def seconds_until_next_step(now: float = None) -> float:
+    if now is None:
+        now = time.time()
+    return ATTENDANCE_CODE_STEP_SECONDS - (now % ATTENDANCE_CODE_STEP_SECONDS)
+
+
+#HOTP(RFC 4226) 방식의 동적 절단으로 기존과 같은 3자리 코드 생성
+# secret: 세션을 열 때 만든 무작위 비밀키 (세션마다 달라서 지난 세션의 코드로 다음 코드를 알 수 없음)
+def derive_code(secret: str, step: int) -> str:
+    digest = hmac.new(secret.encode(), step.to_bytes(8, "big"), hashlib.sha256).digest()
+    offset = digest[-1] & 0x0F
+    value = int.from_bytes(digest[offset:offset + 4], "big") & 0x7FFFFFFF
+    return f"{100 + value % 900}"
+
+
+def current_full_code(club_code: str, secret: str, now: float = None) -> str:
+    return f"{club_code}:{derive_code(secret, current_step(now))}"
+
+
+#최근 VALID_CODE_WINDOW개 구간 중 하나의 코드와 일치하는지 계산으로 확인
+def verify_code(club_code: str, secret: str, full_code: str, now: float = None) -> bool:
+    prefix = f"{club_code}:"
+    if not full_code.startswith(prefix):
+        return False
+    code = full_code[len(prefix):]
+    step = current_step(now)
+    return any(
+        hmac.compare_digest(derive_code(secret, step - i), code)
+        for i in range(VALID_CODE_WINDOW)
+    )
+
+
+#출석 요청마다 저장소를 읽지 않도록 워커에 세션 비밀키를 보관
+# 새 세션이 열려 비밀키가 바뀌었으면 검증에 실패했을 때 한 번 다시 읽음
+class SessionSecrets:
+    def __init__(self, store=attendance_store):
+        self.store = store
+        self.secrets = {}
+
+    async def get(self, club_code: str, refresh: bool = False) -> Optional[str]:
+        if refresh or club_code not in self.secrets:
+            secret = await self.store.session_secret(club_code)
+            if secret is None:
+                self.secrets.pop(club_code, None)
+                return None
+            self.secrets[club_code] = secret
+        return self.secrets[club_code]
+
+    async def verify(self, club_code: str, full_code: str) -> bool:
+        secret = await self.get(club_code)
+        if secret is not None and verify_code(club_code, secret, full_code):
+            return True
+        fresh = await self.get(club_code, refresh=True)
+        return fresh is not None and fresh != secret and verify_code(club_code, fresh, full_code)
+
+
+session_secrets = SessionSecrets()
@@ -0,0 +1,84 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from app.redis_client import get_redis
+from app.services.session_store import ATTENDANCE_SESSION_BACKEND
+
+SUBSCRIBER_QUEUE_SIZE = 256
+# 워커 사이 출석 세션 제어용 이벤트 (출석 현황 화면에는 전달하지 않음)
+CODE_EVENT = "code"
+CODE_ACCEPTED_EVENT = "code_accepted"
+SESSION_CLOSED_EVENT = "session_closed"
+CONTROL_EVENT_TYPES = {CODE_EVENT, CODE_ACCEPTED_EVENT, SESSION_CLOSED_EVENT}
+
+
+#같은 워커 안에서만 전달하는 출석 이벤트 버스
+class MemoryEventBus:
+    def __init__(self):
+        self.subscribers = {}
+
+    async def publish(self, club_code: str, event: dict):
+        for queue in list(self.subscribers.get(club_code, ())):
+            if queue.full():
+                # 느린 구독자는 가장 오래된 이벤트를 버림
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def subscribe(self, club_code: str):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.setdefault(club_code, set()).add(queue)
+        try:
+            yield self._iterate(queue)
+        finally:
+            subscribers = self.subscribers.get(club_code)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self.subscribers[club_code]
+
+    async def _iterate(self, queue: asyncio.Queue):
+        while True:
+            yield await queue.get()
+
+
+#출석을 받은 워커와 리더 소켓이 붙은 워커가 달라도 전달되는 Redis pub/sub 버스
+class RedisEventBus:
+    def __init__(self, redis=None):
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def _channel(self, club_code: str) -> str:
+        return f"attendance:{{{club_code}}}:events"
+
+    async def publish(self, club_code: str, event: dict):
+        await self.redis.publish(self._channel(club_code), json.dumps(event, ensure_ascii=False))
+
+    @asynccontextmanager
+    async def subscribe(self, club_code: str):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self._channel(club_code))
+        try:
+            yield self._iterate(pubsub)
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
+    async def _iterate(self, pubsub):
+        async for message in pubsub.listen():
+            if message.get("type") == "message":
+                yield json.loads(message["data"])
+
+
+def create_event_bus():
+    if ATTENDANCE_SESSION_BACKEND == "redis":
+        return RedisEventBus()
+    return MemoryEventBus()
+
+
+attendance_events = create_event_bus()
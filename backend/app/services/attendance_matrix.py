@@ -0,0 +1,177 @@
+import base64
+import json
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Attendance, AttendanceDate, StuClub, User
+
+ROSTER_PAGE_MAX = 500
+# user_id, name: 회원 정보 / dates: 날짜별 출석 / attended: 조회 기간 내 출석 횟수
+ROSTER_COLUMNS = ("user_id", "name", "dates", "attended")
+DEFAULT_ROSTER_COLUMNS = ("user_id", "name", "dates")
+
+
+def parse_roster_columns(columns) -> tuple:
+    if not columns:
+        return DEFAULT_ROSTER_COLUMNS
+    selected = tuple(c.strip() for c in columns.split(",") if c.strip())
+    if not selected or any(c not in ROSTER_COLUMNS for c in selected):
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 열입니다. (가능: {', '.join(ROSTER_COLUMNS)})")
+    return selected
+
+
+#회원 목록 다음 페이지 위치 (이름, user_id 순 정렬 기준)
+def encode_roster_cursor(name: str, user_id: str) -> str:
+    raw = json.dumps([name, user_id], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_roster_cursor(cursor: str) -> tuple:
+    try:
+        name, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(name), str(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다.")
+
+
+#회원 × 날짜 출석 여부 행렬
+class AttendanceMatrix:
+    def __init__(self, user_ids: list, names: list, dates: list, matrix: np.ndarray, next_cursor: str = None):
+        self.user_ids = user_ids
+        self.names = names
+        self.dates = dates
+        self.matrix = matrix
+        self.next_cursor = next_cursor
+
+    @property
+    def date_columns(self) -> list:
+        return [str(d) for d in self.dates]
+
+    def _member_fields(self, columns) -> list:
+        fields = [{} for _ in self.user_ids]
+        if "user_id" in columns:
+            for field, user_id in zip(fields, self.user_ids):
+                field["user_id"] = user_id
+        if "name" in columns:
+            for field, name in zip(fields, self.names):
+                field["name"] = name
+        if "attended" in columns:
+            for field, attended in zip(fields, self.matrix.sum(axis=1).tolist()):
+                field["attended"] = attended
+        return fields
+
+    #기존 응답 형식: 회원마다 {"user_id", "name", 날짜: 출석여부}
+    def to_rows(self, columns=DEFAULT_ROSTER_COLUMNS) -> list:
+        rows = self._member_fields(columns)
+        if "dates" in columns:
+            date_columns = self.date_columns
+            for row, values in zip(rows, self.matrix.tolist()):
+                row.update(zip(date_columns, values))
+        return rows
+
+    #열 기반 압축 형식: 회원마다 날짜 순서대로 1비트씩 (앞 비트부터) 채운 뒤 base64로 인코딩
+    def to_columnar(self, columns=DEFAULT_ROSTER_COLUMNS) -> dict:
+        result = {
+            "format": "columnar",
+            "members": self._member_fields(columns),
+            "dates": self.date_columns,
+        }
+        if "dates" in columns:
+            packed = np.packbits(self.matrix, axis=1)
+            result["rows"] = [base64.b64encode(row.tobytes()).decode("ascii") for row in packed]
+        return result
+
+
+# 쿼리 결과의 (user_id, date_id)를 정렬된 키 배열에서 찾아 한 번에 행렬에 채움
+def build_attendance_matrix(members, dates, attended) -> AttendanceMatrix:
+    user_ids = [m[0] for m in members]
+    names = [m[1] for m in members]
+    date_ids = np.fromiter((d[0] for d in dates), dtype=np.int64, count=len(dates))
+    matrix = np.zeros((len(user_ids), len(date_ids)), dtype=bool)
+
+    if attended and user_ids and len(date_ids):
+        att_users = np.array([a[0] for a in attended])
+        att_dates = np.fromiter((a[1] for a in attended), dtype=np.int64, count=len(attended))
+
+        member_keys = np.array(user_ids)
+        member_order = np.argsort(member_keys)
+        sorted_members = member_keys[member_order]
+        member_pos = np.searchsorted(sorted_members, att_users).clip(max=len(sorted_members) - 1)
+
+        date_order = np.argsort(date_ids)
+        sorted_dates = date_ids[date_order]
+        date_pos = np.searchsorted(sorted_dates, att_dates).clip(max=len(sorted_dates) - 1)
+
+        # 탈퇴한 회원이나 리더의 기록은 제외
+        found = (sorted_members[member_pos] == att_users) & (sorted_dates[date_pos] == att_dates)
+        matrix[member_order[member_pos[found]], date_order[date_pos[found]]] = True
+
+    return AttendanceMatrix(user_ids, names, [d[1] for d in dates], matrix)
+
+
+# 날짜, 회원, 출석 기록을 각각 한 번씩 조회해 행렬 생성
+# date_from/date_to: 날짜 범위 / cursor, limit: 이름·user_id 순 회원 페이지
+# include_attendance=False면 출석 기록은 조회하지 않음 (회원 정보만 필요할 때)
+async def load_attendance_matrix(
+    club_code: str,
+    db: AsyncSession,
+    date_from=None,
+    date_to=None,
+    cursor: str = None,
+    limit: int = None,
+    include_attendance: bool = True,
+) -> AttendanceMatrix:
+    date_filters = [AttendanceDate.club_code == club_code]
+    if date_from is not None:
+        date_filters.append(AttendanceDate.date >= date_from)
+    if date_to is not None:
+        date_filters.append(AttendanceDate.date <= date_to)
+
+    dates = []
+    if include_attendance:
+        date_result = await db.execute(
+            select(AttendanceDate.id, AttendanceDate.date)
+            .where(*date_filters)
+            .order_by(AttendanceDate.date)
+        )
+        dates = date_result.all()
+
+    member_stmt = (
+        select(User.user_id, User.name)
+        .join(StuClub, StuClub.user_id == User.user_id)
+        .where(StuClub.club_code == club_code)
+        .where(User.is_leader == False)
+        .order_by(User.name, User.user_id)
+    )
+    if cursor:
+        name, user_id = decode_roster_cursor(cursor)
+        member_stmt = member_stmt.where(or_(
+            User.name > name,
+            and_(User.name == name, User.user_id > user_id),
+        ))
+    if limit is not None:
+        member_stmt = member_stmt.limit(limit + 1)
+    members = (await db.execute(member_stmt)).all()
+
+    next_cursor = None
+    if limit is not None and len(members) > limit:
+        members = members[:limit]
+        next_cursor = encode_roster_cursor(members[-1].name, members[-1].user_id)
+
+    attended = []
+    if dates and members:
+        attendance_stmt = (
+            select(Attendance.user_id, Attendance.attendance_date_id)
+            .join(AttendanceDate, Attendance.attendance_date_id == AttendanceDate.id)
+            .where(*date_filters)
+            .where(Attendance.status == True)
+        )
+        if limit is not None:
+            # 현재 페이지 회원의 기록만 조회
+            attendance_stmt = attendance_stmt.where(Attendance.user_id.in_([m.user_id for m in members]))
+        attended = (await db.execute(attendance_stmt)).all()
+
+    matrix = build_attendance_matrix(members, dates, attended)
+    matrix.next_cursor = next_cursor
+    return matrix
@@ -0,0 +1,272 @@
+# 회원별 출석 요약 (attendance_summaries)
+# 출석 기록, 출석 날짜, 회원 구성이 바뀌는 함수에서 커밋 전에 함께 갱신
+# 요약이 어긋났을 때 확인/재생성:
+#   python -m app.services.attendance_summary check [--club CODE]
+#   python -m app.services.attendance_summary rebuild [--club CODE]
+import os
+from datetime import datetime
+from typing import Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy import select, delete, update, func, and_, exists, literal, true, union_all
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.models import Attendance, AttendanceDate, AttendanceSummary, StuClub, User
+
+SUMMARY_FIELDS = ("attended_count", "total_sessions", "last_attended_at")
+# add_attended가 한 문장에 묶는 최대 출석 수 (SQLite의 UNION 항 수 제한 500 아래로 유지)
+ADD_ATTENDED_CHUNK = 100
+
+
+# 원본 출석 기록에서 계산한 (동아리, 회원)별 요약
+def _expected_summaries(club_code: Optional[str] = None, user_ids=None):
+    stmt = (
+        select(
+            StuClub.club_code,
+            StuClub.user_id,
+            func.count(func.distinct(Attendance.id)).label("attended_count"),
+            func.count(func.distinct(AttendanceDate.id)).label("total_sessions"),
+            func.max(Attendance.timestamp).label("last_attended_at"),
+        )
+        .select_from(StuClub)
+        .outerjoin(AttendanceDate, AttendanceDate.club_code == StuClub.club_code)
+        .outerjoin(Attendance, and_(
+            Attendance.attendance_date_id == AttendanceDate.id,
+            Attendance.user_id == StuClub.user_id,
+            Attendance.status == True,
+        ))
+        .group_by(StuClub.club_code, StuClub.user_id)
+    )
+    if club_code is not None:
+        stmt = stmt.where(StuClub.club_code == club_code)
+    if user_ids is not None:
+        stmt = stmt.where(StuClub.user_id.in_(user_ids))
+    return stmt
+
+
+#요약을 원본에서 다시 계산 (user_ids가 없으면 동아리 전체, club_code도 없으면 모든 동아리)
+async def refresh_summaries(db: AsyncSession, club_code: Optional[str] = None, user_ids=None):
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+    stale = delete(AttendanceSummary)
+    if club_code is not None:
+        stale = stale.where(AttendanceSummary.club_code == club_code)
+    if user_ids is not None:
+        stale = stale.where(AttendanceSummary.user_id.in_(user_ids))
+    await db.execute(stale)
+    await db.execute(
+        AttendanceSummary.__table__.insert().from_select(
+            ["club_code", "user_id", *SUMMARY_FIELDS],
+            _expected_summaries(club_code, user_ids),
+        )
+    )
+
+
+# 출석 한 건: 그 날짜가 남아 있고 아직 출석 처리되지 않았을 때만 한 행을 만드는 SELECT
+def _new_attendance(club_code: str, user_id: str, date_id: int, timestamp):
+    other_dates = aliased(AttendanceDate)
+    return (
+        select(
+            AttendanceDate.club_code,
+            literal(user_id),
+            literal(1),
+            # 요약이 아직 없는 회원은 현재 날짜 수로 시작
+            select(func.count(other_dates.id)).where(other_dates.club_code == club_code).scalar_subquery(),
+            literal(timestamp or datetime.utcnow()),
+        )
+        .where(
+            AttendanceDate.id == date_id,
+            AttendanceDate.club_code == club_code,
+            ~exists().where(
+                Attendance.user_id == user_id,
+                Attendance.attendance_date_id == date_id,
+                Attendance.status == True,
+            ),
+        )
+    )
+
+
+#새로 출석한 기록만큼 출석 횟수 증가 (rows: [(club_code, user_id, date_id, 출석시각)])
+# 출석 upsert보다 먼저 실행해야 함: 이미 출석인 행(세션 중 일괄 수정, 다시 저장하는 행)은 세지 않음
+async def add_attended(db: AsyncSession, rows):
+    rows = list(rows)
+    columns = ["club_code", "user_id", *SUMMARY_FIELDS]
+    for start in range(0, len(rows), ADD_ATTENDED_CHUNK):
+        selects = [_new_attendance(*row) for row in rows[start:start + ADD_ATTENDED_CHUNK]]
+        source = selects[0]
+        if len(selects) > 1:
+            # MySQL의 INSERT ... SELECT ... ON DUPLICATE KEY UPDATE에 UNION을 바로 쓰지 않도록 파생 테이블로 감쌈
+            # (SQLite는 upsert의 SELECT에 WHERE가 있어야 ON CONFLICT를 구분함)
+            source = select(union_all(*selects).subquery()).where(true())
+        if db.get_bind().dialect.name == "sqlite":
+            stmt = sqlite_insert(AttendanceSummary).from_select(columns, source)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["club_code", "user_id"],
+                set_={
+                    "attended_count": AttendanceSummary.attended_count + 1,
+                    "last_attended_at": stmt.excluded.last_attended_at,
+                },
+            )
+        else:
+            stmt = mysql_insert(AttendanceSummary).from_select(columns, source)
+            stmt = stmt.on_duplicate_key_update(
+                attended_count=AttendanceSummary.attended_count + 1,
+                last_attended_at=stmt.inserted.last_attended_at,
+            )
+        await db.execute(stmt)
+
+
+#출석 날짜가 추가되면 동아리 회원 전체의 전체 횟수 증가
+async def add_session(db: AsyncSession, club_code: str, count: int = 1):
+    await db.execute(
+        update(AttendanceSummary)
+        .where(AttendanceSummary.club_code == club_code)
+        .values(total_sessions=AttendanceSummary.total_sessions + count)
+    )
+
+
+async def remove_summaries(db: AsyncSession, club_code: Optional[str] = None, user_id: Optional[str] = None):
+    stmt = delete(AttendanceSummary)
+    if club_code is not None:
+        stmt = stmt.where(AttendanceSummary.club_code == club_code)
+    if user_id is not None:
+        stmt = stmt.where(AttendanceSummary.user_id == user_id)
+    await db.execute(stmt)
+
+
+#요약 테이블과 원본 계산 결과가 다른 항목 목록
+async def check_summaries(db: AsyncSession, club_code: Optional[str] = None) -> list:
+    expected = {
+        (r.club_code, r.user_id): r
+        for r in (await db.execute(_expected_summaries(club_code))).all()
+    }
+    stored_stmt = select(AttendanceSummary)
+    if club_code is not None:
+        stored_stmt = stored_stmt.where(AttendanceSummary.club_code == club_code)
+    stored = {(s.club_code, s.user_id): s for s in (await db.execute(stored_stmt)).scalars()}
+
+    problems = []
+    for key in expected.keys() - stored.keys():
+        problems.append({"club_code": key[0], "user_id": key[1], "problem": "missing"})
+    for key in stored.keys() - expected.keys():
+        problems.append({"club_code": key[0], "user_id": key[1], "problem": "orphan"})
+    for key in expected.keys() & stored.keys():
+        for field in SUMMARY_FIELDS:
+            want, have = getattr(expected[key], field), getattr(stored[key], field)
+            if field == "last_attended_at":
+                # 요약은 출석 처리 시각, 원본은 행의 timestamp를 쓰므로 출석 여부만 비교
+                want, have = want is not None, have is not None
+            if want != have:
+                problems.append({
+                    "club_code": key[0],
+                    "user_id": key[1],
+                    "problem": field,
+                    "expected": want,
+                    "actual": have,
+                })
+    return problems
+
+
+# 출석률은 오늘까지 지난 날짜만 기준으로 계산 (출석 통계 load_club_analytics와 같은 정의)
+# 요약 테이블은 등록된 모든 날짜를 세므로 읽을 때 아직 지나지 않은 날짜만큼 빼서 보정
+ATTENDANCE_TIMEZONE = ZoneInfo(os.getenv("ANALYTICS_TIMEZONE", "Asia/Seoul"))
+
+
+def attendance_today():
+    return datetime.now(ATTENDANCE_TIMEZONE).date()
+
+
+def _held_summaries(club_code: str):
+    today = attendance_today()
+    held_sessions = (
+        select(func.count(AttendanceDate.id))
+        .where(AttendanceDate.club_code == club_code, AttendanceDate.date <= today)
+        .scalar_subquery()
+    )
+    # 미래 날짜에 미리 출석 처리된 기록 (보통 없으므로 동아리의 남은 날짜만큼만 읽음)
+    upcoming = (
+        select(Attendance.user_id, func.count().label("attended"))
+        .join(AttendanceDate, AttendanceDate.id == Attendance.attendance_date_id)
+        .where(
+            AttendanceDate.club_code == club_code,
+            AttendanceDate.date > today,
+            Attendance.status == True,
+        )
+        .group_by(Attendance.user_id)
+        .subquery()
+    )
+    return (
+        select(
+            User.user_id,
+            User.name,
+            (AttendanceSummary.attended_count - func.coalesce(upcoming.c.attended, 0)).label("attended_count"),
+            held_sessions.label("total_sessions"),
+            AttendanceSummary.last_attended_at,
+        )
+        .join(AttendanceSummary, AttendanceSummary.user_id == User.user_id)
+        .outerjoin(upcoming, upcoming.c.user_id == User.user_id)
+        .where(AttendanceSummary.club_code == club_code)
+    )
+
+
+# 리더 화면/통계용: 회원 수만큼만 읽음
+async def load_club_summaries(club_code: str, db: AsyncSession) -> list:
+    result = await db.execute(
+        _held_summaries(club_code)
+        .where(User.is_leader == False)
+        .order_by(User.name)
+    )
+    return [_summary_dict(r) for r in result]
+
+
+async def load_member_summary(club_code: str, user_id: str, db: AsyncSession) -> dict:
+    result = await db.execute(_held_summaries(club_code).where(AttendanceSummary.user_id == user_id))
+    row = result.first()
+    if row is None:
+        return {"user_id": user_id, "name": None, "attended": 0, "total": 0, "rate": 0.0, "last_attended_at": None}
+    return _summary_dict(row)
+
+
+def _summary_dict(r) -> dict:
+    return {
+        "user_id": r.user_id,
+        "name": r.name,
+        "attended": r.attended_count,
+        "total": r.total_sessions,
+        "rate": round(r.attended_count / r.total_sessions, 4) if r.total_sessions else 0.0,
+        "last_attended_at": r.last_attended_at,
+    }
+
+
+async def _main(argv=None):
+    import argparse
+    from app.db import AsyncSessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="출석 요약 테이블 확인/재생성")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--club", help="특정 동아리 코드만 처리")
+    args = parser.parse_args(argv)
+
+    try:
+        async with AsyncSessionLocal() as db:
+            if args.command == "rebuild":
+                await refresh_summaries(db, args.club)
+                await db.commit()
+                print("[출석요약] 재생성 완료")
+            problems = await check_summaries(db, args.club)
+        for problem in problems:
+            print(problem)
+        print(f"[출석요약] 불일치 {len(problems)}건")
+        return 1 if problems else 0
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    sys.exit(asyncio.run(_main()))
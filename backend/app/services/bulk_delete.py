@@ -0,0 +1,28 @@
+import os
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 한 번에 지우는 최대 행 수 (배치마다 커밋해서 큰 삭제가 테이블을 오래 잠그지 않도록 함)
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "2000"))
+
+
+# 삭제할 id를 파이썬으로 가져오지 않고 DELETE 한 문장으로 최대 batch_size개 삭제
+# MySQL은 DELETE ... LIMIT, 그 외(SQLite)는 조건에 맞는 앞쪽 batch_size개의 최대 id 이하만 삭제
+def _batch_delete(db: AsyncSession, model, criteria, batch_size: int):
+    stmt = delete(model).execution_options(synchronize_session=False)
+    if db.get_bind().dialect.name == "mysql":
+        return stmt.where(*criteria).with_dialect_options(mysql_limit=batch_size)
+    batch = select(model.id).where(*criteria).order_by(model.id).limit(batch_size).subquery()
+    return stmt.where(*criteria, model.id <= select(func.max(batch.c.id)).scalar_subquery())
+
+
+#조건에 맞는 행을 DELETE_BATCH_SIZE개씩 삭제하고 배치마다 커밋, 삭제한 행 수 반환
+# 중간에 실패해도 같은 조건으로 다시 실행하면 남은 행부터 이어서 삭제됨
+async def delete_in_batches(db: AsyncSession, model, *criteria, batch_size: int = DELETE_BATCH_SIZE) -> int:
+    deleted = 0
+    while True:
+        result = await db.execute(_batch_delete(db, model, criteria, batch_size))
+        await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
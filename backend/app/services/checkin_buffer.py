@@ -0,0 +1,380 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from app.db import AsyncSessionLocal
+from app.redis_client import get_redis
+from app.services.attend_service import attendance_upsert, save_check_in
+from app.services.session_store import attendance_store, ATTENDANCE_SESSION_BACKEND
+from app.services.attendance_code import is_totp_mode, session_secrets
+from app.services.attendance_events import attendance_events
+from app.services.club_version import bump_club_version
+from app.services.attendance_summary import add_attended
+from app.logger import get_attendance_logger
+
+logger = get_attendance_logger()
+
+# 출석을 접수 즉시 응답하고 모아서 저장
+# memory 세션 저장소: 대기 중인 출석은 워커 메모리에만 있어서, 워커가 비정상 종료(OOM, kill -9 등)되면
+#   마지막 저장 이후 접수된 출석(최대 ATTENDANCE_FLUSH_INTERVAL_MS 분량)이 사라짐
+#   정상 종료와 세션 종료 때는 남은 출석을 모두 저장
+# redis 세션 저장소: 대기 중인 출석을 Redis 목록에 두므로 워커가 죽어도 다른 워커가 이어서 저장
+ATTENDANCE_WRITE_BEHIND = os.getenv("ATTENDANCE_WRITE_BEHIND", "false").lower() in {"1", "true", "yes", "on"}
+ATTENDANCE_FLUSH_INTERVAL_MS = int(os.getenv("ATTENDANCE_FLUSH_INTERVAL_MS", "300"))
+ATTENDANCE_FLUSH_MAX_ROWS = int(os.getenv("ATTENDANCE_FLUSH_MAX_ROWS", "200"))
+# 이 시간 동안 소식이 없는 워커의 처리 중 목록은 대기열로 되돌림
+ATTENDANCE_BUFFER_WORKER_TTL_SECONDS = int(os.getenv("ATTENDANCE_BUFFER_WORKER_TTL_SECONDS", "60"))
+ATTENDANCE_DRAIN_RETRIES = 3
+# 저장할 수 없는 출석(삭제된 날짜/회원 등)을 보관하는 최대 건수
+ATTENDANCE_DEAD_LETTER_MAX = int(os.getenv("ATTENDANCE_DEAD_LETTER_MAX", "1000"))
+
+
+#워커 메모리의 대기열 (같은 출석은 한 번만 접수)
+class MemoryCheckinQueue:
+    durable = False
+
+    def __init__(self):
+        self.pending = {}
+        self.inflight = {}
+        self.dead_letters = deque(maxlen=ATTENDANCE_DEAD_LETTER_MAX)
+
+    # row: (user_id, date_id, club_code, 접수 시각), 대기 중인 행 수 반환
+    async def push(self, row: tuple) -> int:
+        key = (row[0], row[1])
+        if key not in self.pending and key not in self.inflight:
+            self.pending[key] = row
+        return len(self.pending)
+
+    async def take(self, max_rows: int) -> list:
+        batch = list(self.pending.values())[:max_rows]
+        for row in batch:
+            key = (row[0], row[1])
+            del self.pending[key]
+            self.inflight[key] = row
+        return batch
+
+    async def ack(self, batch: list):
+        for row in batch:
+            self.inflight.pop((row[0], row[1]), None)
+
+    # 저장하지 못한 행은 (취소된 경우 포함) 다음 주기에 다시 시도
+    def retry(self, batch: list):
+        for row in batch:
+            key = (row[0], row[1])
+            self.inflight.pop(key, None)
+            self.pending.setdefault(key, row)
+
+    # 다시 시도해도 저장되지 않는 행은 따로 남기고 대기열에서 뺌 (이어서 ack)
+    async def dead_letter(self, rows: list):
+        self.dead_letters.extend(rows)
+
+    async def leftover(self) -> list:
+        return list(self.pending.values())
+
+    async def release(self):
+        pass
+
+
+# KEYS[1]: 대기열, KEYS[2]: 이 워커의 처리 중 목록, ARGV[1]: 최대 행 수
+# 처리 중 목록이 비어 있을 때만 대기열에서 옮기고, 남아 있으면 (이전 저장 실패) 그대로 다시 반환
+_TAKE_SCRIPT = """
+if redis.call('LLEN', KEYS[2]) == 0 then
+    for i = 1, tonumber(ARGV[1]) do
+        if not redis.call('LMOVE', KEYS[1], KEYS[2], 'LEFT', 'RIGHT') then
+            break
+        end
+    end
+end
+return redis.call('LRANGE', KEYS[2], 0, -1)
+"""
+
+# KEYS[1]: 대기열, KEYS[2]: 처리 중 목록 → 처리 중이던 행을 대기열 앞으로 되돌림
+_REQUEUE_SCRIPT = """
+local moved = 0
+while redis.call('LMOVE', KEYS[2], KEYS[1], 'RIGHT', 'LEFT') do
+    moved = moved + 1
+end
+return moved
+"""
+
+
+#여러 워커가 공유하는 Redis 대기열
+# 저장할 행을 워커별 처리 중 목록으로 옮긴(LMOVE) 뒤 커밋이 끝나야 지우므로,
+# 저장 도중 워커가 죽어도 다른 워커가 그 목록을 대기열로 되돌려 저장함 (출석 upsert는 여러 번 실행해도 같음)
+class RedisCheckinQueue:
+    durable = True
+    # Redis Cluster에서 스크립트가 두 목록을 함께 다루도록 같은 해시태그 사용
+    pending_key = "attendance:{checkins}:pending"
+    workers_key = "attendance:{checkins}:workers"
+    dead_letters_key = "attendance:{checkins}:dead"
+
+    def __init__(self, redis=None, worker_id: str = None, worker_ttl_seconds: int = ATTENDANCE_BUFFER_WORKER_TTL_SECONDS):
+        self._redis = redis
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self.worker_ttl_seconds = worker_ttl_seconds
+        self._take_script = None
+        self._requeue_script = None
+        self._recovered_at = 0.0
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def _processing_key(self, worker_id: str) -> str:
+        return f"attendance:{{checkins}}:processing:{worker_id}"
+
+    def _alive_key(self, worker_id: str) -> str:
+        return f"attendance:{{checkins}}:alive:{worker_id}"
+
+    def _encode(self, row: tuple) -> str:
+        user_id, date_id, club_code, timestamp = row
+        return json.dumps([user_id, date_id, club_code, timestamp.isoformat()], ensure_ascii=False)
+
+    async def push(self, row: tuple) -> int:
+        return await self.redis.rpush(self.pending_key, self._encode(row))
+
+    async def take(self, max_rows: int) -> list:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._alive_key(self.worker_id), 1, ex=self.worker_ttl_seconds)
+            pipe.sadd(self.workers_key, self.worker_id)
+            await pipe.execute()
+        if time.monotonic() - self._recovered_at >= self.worker_ttl_seconds / 2:
+            await self._recover()
+        if self._take_script is None:
+            self._take_script = self.redis.register_script(_TAKE_SCRIPT)
+        raw = await self._take_script(
+            keys=[self.pending_key, self._processing_key(self.worker_id)],
+            args=[max_rows],
+        )
+        batch = []
+        for item in raw:
+            user_id, date_id, club_code, timestamp = json.loads(item)
+            batch.append((user_id, int(date_id), club_code, datetime.fromisoformat(timestamp)))
+        return batch
+
+    async def ack(self, batch: list):
+        await self.redis.delete(self._processing_key(self.worker_id))
+
+    # 처리 중 목록에 남아 있으므로 다음 take에서 다시 반환됨
+    def retry(self, batch: list):
+        pass
+
+    async def dead_letter(self, rows: list):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(self.dead_letters_key, *(self._encode(row) for row in rows))
+            pipe.ltrim(self.dead_letters_key, -ATTENDANCE_DEAD_LETTER_MAX, -1)
+            await pipe.execute()
+
+    async def leftover(self) -> list:
+        return await self.redis.lrange(self._processing_key(self.worker_id), 0, -1)
+
+    async def _requeue(self, worker_id: str) -> int:
+        if self._requeue_script is None:
+            self._requeue_script = self.redis.register_script(_REQUEUE_SCRIPT)
+        return int(await self._requeue_script(keys=[self.pending_key, self._processing_key(worker_id)]))
+
+    #비정상 종료된 워커가 처리하던 행을 대기열로 되돌림
+    async def _recover(self):
+        self._recovered_at = time.monotonic()
+        for worker_id in await self.redis.smembers(self.workers_key):
+            if worker_id == self.worker_id or await self.redis.exists(self._alive_key(worker_id)):
+                continue
+            moved = await self._requeue(worker_id)
+            await self.redis.srem(self.workers_key, worker_id)
+            if moved:
+                logger.warning("[출석버퍼] 종료된 워커 %s의 출석 %d건을 다시 저장 대기열에 넣음", worker_id, moved)
+
+    #종료 시 저장하지 못한 행을 다른 워커가 바로 가져가도록 되돌림
+    async def release(self):
+        await self._requeue(self.worker_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.srem(self.workers_key, self.worker_id)
+            pipe.delete(self._alive_key(self.worker_id))
+            await pipe.execute()
+
+
+def create_checkin_queue():
+    if ATTENDANCE_SESSION_BACKEND == "redis":
+        return RedisCheckinQueue()
+    return MemoryCheckinQueue()
+
+
+#출석 요청을 모아 여러 행 upsert로 한 번에 커밋하는 버퍼
+class CheckinBuffer:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        flush_interval_ms: int = ATTENDANCE_FLUSH_INTERVAL_MS,
+        max_rows: int = ATTENDANCE_FLUSH_MAX_ROWS,
+        queue=None,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self.queue = queue if queue is not None else create_checkin_queue()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = None
+        self._task = None
+
+    #중복 확인은 세션 저장소에서 끝난 상태로 접수
+    async def submit(self, date_id: int, user_id: str, club_code: str):
+        waiting = await self.queue.push((user_id, date_id, club_code, datetime.utcnow()))
+        self._ensure_worker()
+        if waiting >= self.max_rows:
+            self._wakeup.set()
+
+    #공유 대기열은 다른 워커가 남긴 출석도 있을 수 있으므로 시작할 때부터 저장 태스크 실행
+    def start(self):
+        if self.queue.durable:
+            self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("[출석버퍼] 대기열 확인 실패: %s", e)
+
+    async def flush(self) -> bool:
+        async with self._flush_lock:
+            while True:
+                batch = await self.queue.take(self.max_rows)
+                if not batch:
+                    return True
+
+                # 다시 저장하는 행이 섞여도 같은 출석은 한 행으로
+                unique = list({(row[0], row[1]): row for row in batch}.values())
+                committed = False
+                try:
+                    try:
+                        await self._save(unique)
+                    except IntegrityError:
+                        # 한 행 때문에 전체가 막히지 않도록 한 행씩 저장하고 저장할 수 없는 행은 따로 남김
+                        await self._save_each(unique)
+                    committed = True
+                except Exception as e:
+                    logger.error("[출석버퍼] %d건 저장 실패, 재시도 예정: %s", len(unique), e)
+                    return False
+                finally:
+                    if not committed:
+                        self.queue.retry(batch)
+                await self.queue.ack(batch)
+                for club_code in {row[2] for row in unique}:
+                    await bump_club_version(club_code)
+
+    async def _save(self, rows: list):
+        async with self.session_factory() as db:
+            # 이미 출석 처리된 행이나 다시 저장하는 행은 세지 않도록 upsert보다 먼저 실행
+            await add_attended(db, [
+                (club_code, user_id, date_id, timestamp)
+                for user_id, date_id, club_code, timestamp in rows
+            ])
+            await db.execute(attendance_upsert(db, [
+                {
+                    "user_id": user_id,
+                    "attendance_date_id": date_id,
+                    "status": True,
+                    "timestamp": timestamp,
+                }
+                for user_id, date_id, _, timestamp in rows
+            ]))
+            await db.commit()
+
+    #무결성 오류(삭제된 날짜/회원)가 난 행만 보관 목록으로 옮기고 출석 표시를 되돌림
+    # 다른 오류는 그대로 올려서 배치 전체를 다시 시도 (이미 저장한 행은 다시 저장해도 같음)
+    async def _save_each(self, rows: list):
+        rejected = []
+        for row in rows:
+            try:
+                await self._save([row])
+            except IntegrityError as e:
+                logger.error("[출석버퍼] 저장할 수 없는 출석: user=%s date_id=%s (%s)", row[0], row[1], e.orig)
+                rejected.append(row)
+        if not rejected:
+            return
+        await self.queue.dead_letter(rejected)
+        for user_id, date_id, club_code, _ in rejected:
+            try:
+                # 세션이 이미 다른 날짜로 바뀌었으면 그 세션의 출석 표시는 건드리지 않음
+                await attendance_store.sync_attended(club_code, date_id, absent=[user_id])
+            except Exception as e:
+                logger.warning("[출석버퍼] 출석 표시 되돌리기 실패 club=%s user=%s: %s", club_code, user_id, e)
+
+    #남은 출석을 모두 저장 (세션 종료/서버 종료 시)
+    async def drain(self):
+        for _ in range(ATTENDANCE_DRAIN_RETRIES):
+            try:
+                if await self.flush():
+                    return
+            except Exception as e:
+                logger.error("[출석버퍼] 대기열 확인 실패: %s", e)
+            await asyncio.sleep(self.flush_interval)
+        try:
+            leftover = await self.queue.leftover()
+        except Exception as e:
+            logger.error("[출석버퍼] 남은 출석 확인 실패: %s", e)
+            return
+        if self.queue.durable:
+            logger.error("[출석버퍼] 저장하지 못한 출석 %d건은 Redis 대기열에 남아 다음 저장 때 처리됨", len(leftover))
+            return
+        for user_id, date_id, _, timestamp in leftover:
+            logger.error("[출석버퍼] 저장되지 않은 출석: user=%s date_id=%s at=%s", user_id, date_id, timestamp)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.drain()
+        try:
+            await self.queue.release()
+        except Exception as e:
+            logger.error("[출석버퍼] 처리 중 목록 반환 실패: %s", e)
+
+
+checkin_buffer = CheckinBuffer()
+
+
+#세션 명단으로 검증한 뒤 출석을 즉시 저장하거나 버퍼에 접수하고 리더 화면에 알림
+async def record_check_in(user_id: str, club_code: str, full_code: str, db) -> int:
+    # totp 모드에서는 코드를 계산으로 검증하고, 목록 비교는 고정된 코드 출석용으로만 사용
+    code_verified = is_totp_mode() and await session_secrets.verify(club_code, full_code)
+    result = await attendance_store.validate_check_in(club_code, full_code, user_id, code_verified)
+    date_id = result["date_id"]
+    try:
+        if ATTENDANCE_WRITE_BEHIND:
+            await checkin_buffer.submit(date_id, user_id, club_code)
+        else:
+            await save_check_in(user_id, date_id, club_code, db)
+    except Exception:
+        await attendance_store.unmark_attended(club_code, user_id)
+        raise
+
+    try:
+        await attendance_events.publish(club_code, {
+            "type": "check_in",
+            "user_id": user_id,
+            "name": result["name"],
+            "timestamp": datetime.utcnow().isoformat(),
+            "present": result["present"],
+            "total": result["total"],
+        })
+    except Exception as e:
+        # 알림 실패가 출석 자체를 실패시키지 않도록 기록만 남김
+        logger.warning("[출석알림] 전송 실패 club=%s user=%s: %s", club_code, user_id, e)
+    return date_id
@@ -2,8 +2,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
-from sqlalchemy import and_, delete
-from app.models import Club, StuClub, Attendance, AttendanceDate
+from sqlalchemy import delete
+from app.models import Club, StuClub, Attendance, AttendanceDate, User
+from app.services.session_store import attendance_store
+from app.services.club_version import bump_club_version
+from app.services.attendance_summary import refresh_summaries, remove_summaries
 from app.variable import *
 
 #존재하는 동아리인지 체크
@@ -21,8 +24,14 @@ async def joining_club(user_id: str, code: str, db: AsyncSession):
         await join_duplicate(user_id, code, db)
         new_member = StuClub(user_id= user_id, club_code= code)
         db.add(new_member)
+        await db.flush()
+        await refresh_summaries(db, code, [user_id])
         await db.commit()
         await db.refresh(new_member)
+        user = await db.get(User, user_id)
+        if user is not None:
+            await attendance_store.add_member(code, user_id, user.name)
+        await bump_club_version(code)
         return new_member
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail="데이터베이스 오류")
@@ -47,25 +56,22 @@ async def club_quit(id: str, code: str, db: AsyncSession):
     try:
         stuclub = await check_joining(id, code, db)
 
-        # 1. 출석 날짜 조회
-        date_ids_result = await db.execute(
-            select(AttendanceDate.id).where(AttendanceDate.club_code == code)
-        )
-        date_ids = date_ids_result.scalars().all()
-
-        # 2. 출석 기록 삭제
-        if date_ids:
-            stmt = delete(Attendance).where(
-                and_(
-                    Attendance.user_id == id,
-                    Attendance.attendance_date_id.in_(date_ids)
-                )
+        # 1. 이 동아리의 출석 기록 삭제 (날짜 목록을 불러오지 않고 하위 쿼리로 지정)
+        await db.execute(
+            delete(Attendance).where(
+                Attendance.user_id == id,
+                Attendance.attendance_date_id.in_(
+                    select(AttendanceDate.id).where(AttendanceDate.club_code == code)
+                ),
             )
-            await db.execute(stmt)
+        )
 
-        # 3. 가입 정보 삭제
+        # 2. 가입 정보 삭제
         await db.delete(stuclub)
+        await remove_summaries(db, code, id)
         await db.commit()
+        await attendance_store.remove_member(code, id)
+        await bump_club_version(code)
         return
 
     except SQLAlchemyError as e:
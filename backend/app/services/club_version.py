@@ -0,0 +1,81 @@
+import time
+from typing import Optional
+from fastapi import Request, Response
+from app.redis_client import get_redis
+from app.utils.etag import make_etag, etag_matches
+from app.services.read_routing import pin_club_after_write
+from app.logger import get_admin_logger
+
+logger = get_admin_logger()
+
+# attendance: 출석 기록, 출석 날짜, 회원 구성 / schedules: 동아리 일정
+ATTENDANCE = "attendance"
+SCHEDULES = "schedules"
+
+
+#여러 워커가 공유하는 Redis 기반 데이터 버전
+class RedisVersionStore:
+    def __init__(self, redis=None):
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def _key(self, club_code: str, scope: str) -> str:
+        return f"club:{{{club_code}}}:version:{scope}"
+
+    # 키가 없을 때 0부터 시작하면 Redis가 초기화된 뒤 예전 버전과 겹칠 수 있으므로 현재 시각에서 시작
+    async def get(self, club_code: str, scope: str = ATTENDANCE) -> str:
+        key = self._key(club_code, scope)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, time.time_ns(), nx=True)
+            pipe.get(key)
+            _, version = await pipe.execute()
+        return str(version)
+
+    async def bump(self, club_code: str, *scopes: str):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for scope in scopes or (ATTENDANCE,):
+                key = self._key(club_code, scope)
+                pipe.set(key, time.time_ns(), nx=True)
+                pipe.incr(key)
+            await pipe.execute()
+
+
+# 출석 세션 저장소 설정과 관계없이 항상 Redis 사용 (레이트 리미터 때문에 Redis는 이미 필수)
+# 워커마다 버전을 따로 세면 다른 워커의 쓰기를 놓쳐 오래된 캐시를 돌려주게 됨
+def create_version_store():
+    return RedisVersionStore()
+
+
+club_versions = create_version_store()
+
+
+#커밋 이후 호출: 버전 갱신 실패가 이미 끝난 쓰기를 실패시키지 않도록 기록만 남김
+async def bump_club_version(club_code: str, *scopes: str):
+    try:
+        await club_versions.bump(club_code, *scopes)
+    except Exception as e:
+        logger.error("[데이터버전] 갱신 실패 club=%s scopes=%s: %s", club_code, scopes or (ATTENDANCE,), e)
+    await pin_club_after_write(club_code)
+
+
+#데이터 버전으로 ETag를 만들어 클라이언트의 If-None-Match와 같으면 304 응답 반환
+# 다르면 response에 ETag를 붙이고 None 반환 (이후 평소대로 조회)
+# 버전을 조회보다 먼저 읽으므로 그 사이의 쓰기는 다음 요청에서 새 ETag로 반영됨
+async def not_modified(request: Request, response: Response, club_code: str, scope: str, *parts) -> Optional[Response]:
+    try:
+        version = await club_versions.get(club_code, scope)
+    except Exception as e:
+        logger.error("[데이터버전] 조회 실패 club=%s scope=%s: %s", club_code, scope, e)
+        return None
+    # 같은 경로라도 쿼리 파라미터와 사용자마다 응답이 다르므로 함께 반영
+    etag = make_etag(version, club_code, scope, request.url.path, request.url.query, *parts)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
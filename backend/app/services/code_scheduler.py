@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from fastapi import WebSocket
+from app.services.session_store import attendance_store
+from app.services.attendance_events import attendance_events, CODE_EVENT
+from app.services.attendance_code import (
+    ATTENDANCE_CODE_STEP_SECONDS,
+    generate_random_code,
+    is_totp_mode,
+    current_full_code,
+    seconds_until_next_step,
+)
+from app.logger import get_admin_logger
+
+logger = get_admin_logger()
+
+ATTENDANCE_HEARTBEAT_INTERVAL_SECONDS = int(os.getenv("ATTENDANCE_HEARTBEAT_INTERVAL_SECONDS", "15"))
+ATTENDANCE_HEARTBEAT_TIMEOUT_SECONDS = int(os.getenv("ATTENDANCE_HEARTBEAT_TIMEOUT_SECONDS", "60"))
+ATTENDANCE_SEND_TIMEOUT_SECONDS = float(os.getenv("ATTENDANCE_SEND_TIMEOUT_SECONDS", "5"))
+# 코드를 교체하던 워커가 죽으면 이 시간 뒤 다른 워커가 이어서 교체
+ATTENDANCE_ROTATOR_TTL_MS = int((ATTENDANCE_CODE_STEP_SECONDS * 2 + 5) * 1000)
+
+ROTATE = "rotate"
+HEARTBEAT = "heartbeat"
+
+
+class ScheduledClient:
+    def __init__(self):
+        # 클라이언트가 ping을 보낸 적이 있을 때만 응답 시간 초과로 끊음
+        self.heartbeat = False
+        self.last_seen = time.time()
+
+
+class ScheduledSession:
+    def __init__(self, club_code: str, generation: int):
+        self.club_code = club_code
+        self.generation = generation
+        self.accepted = False
+        self.clients = {}
+
+
+#모든 출석 세션의 코드 교체를 하나의 태스크와 힙으로 처리
+class CodeRotationScheduler:
+    def __init__(self, store=attendance_store, events=attendance_events):
+        self.store = store
+        self.events = events
+        self.sessions = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._generation = itertools.count()
+        self._wakeup = None
+        self._task = None
+        self._jobs = set()
+
+    def _schedule(self, due: float, kind: str, entry: ScheduledSession):
+        heapq.heappush(self._heap, (due, next(self._seq), kind, entry.club_code, entry.generation))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_worker(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def register(self, club_code: str) -> ScheduledSession:
+        entry = ScheduledSession(club_code, next(self._generation))
+        self.sessions[club_code] = entry
+        self._ensure_worker()
+        now = time.time()
+        self._schedule(now, ROTATE, entry)
+        self._schedule(now + ATTENDANCE_HEARTBEAT_INTERVAL_SECONDS, HEARTBEAT, entry)
+        return entry
+
+    def unregister(self, club_code: str):
+        self.sessions.pop(club_code, None)
+
+    def add_client(self, club_code: str, websocket: WebSocket):
+        entry = self.sessions.get(club_code)
+        if entry is not None:
+            entry.clients[websocket] = ScheduledClient()
+
+    def remove_client(self, club_code: str, websocket: WebSocket):
+        entry = self.sessions.get(club_code)
+        if entry is not None:
+            entry.clients.pop(websocket, None)
+
+    #코드 출석으로 전환되면 더 이상 코드를 교체하지 않음
+    def accept(self, club_code: str):
+        entry = self.sessions.get(club_code)
+        if entry is not None:
+            entry.accepted = True
+
+    def touch(self, club_code: str, websocket: WebSocket, heartbeat: bool = False):
+        entry = self.sessions.get(club_code)
+        client = entry.clients.get(websocket) if entry is not None else None
+        if client is not None:
+            client.last_seen = time.time()
+            client.heartbeat = client.heartbeat or heartbeat
+
+    def _next_rotation(self, now: float) -> float:
+        if is_totp_mode():
+            return now + seconds_until_next_step(now)
+        return now + ATTENDANCE_CODE_STEP_SECONDS
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.time()
+            due = self._heap[0][0]
+            if due > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            while self._heap and self._heap[0][0] <= now:
+                _, _, kind, club_code, generation = heapq.heappop(self._heap)
+                entry = self.sessions.get(club_code)
+                if entry is None or entry.generation != generation:
+                    continue
+                if kind == ROTATE:
+                    if entry.accepted:
+                        continue
+                    self._spawn(self._rotate(entry))
+                    self._schedule(self._next_rotation(now), ROTATE, entry)
+                else:
+                    self._spawn(self._check_heartbeat(entry, now))
+                    self._schedule(now + ATTENDANCE_HEARTBEAT_INTERVAL_SECONDS, HEARTBEAT, entry)
+
+    # 전송은 각각의 태스크로 실행하고 기다리지 않음 (느린 화면 하나가 다른 동아리의 코드 교체를 늦추지 않도록)
+    def _spawn(self, job):
+        task = asyncio.create_task(job)
+        self._jobs.add(task)
+        task.add_done_callback(self._job_done)
+
+    def _job_done(self, task: asyncio.Task):
+        self._jobs.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("[출석세션] 코드 전송 작업 실패: %s", task.exception())
+
+    async def _rotate(self, entry: ScheduledSession):
+        # 모든 화면이 끊긴 유예 시간 동안은 마지막 코드를 유지
+        if not entry.clients:
+            # 화면이 남아 있는 다른 워커가 교체를 이어받도록 잠금 해제
+            if not is_totp_mode():
+                await self.store.release_rotator(entry.club_code)
+            return
+        if is_totp_mode():
+            # 계산으로 검증하므로 저장소에 코드를 쌓지 않고, 워커마다 같은 코드를 계산해 전송
+            secret = await self.store.session_secret(entry.club_code)
+            if secret is None:
+                return
+            await self.broadcast(entry.club_code, current_full_code(entry.club_code, secret))
+            return
+        # 세션마다 잠금을 가진 한 워커만 코드를 만들고, 모든 워커가 이벤트를 받아 자기 화면에 전송
+        if not await self.store.claim_rotator(entry.club_code, ttl_ms=ATTENDANCE_ROTATOR_TTL_MS):
+            return
+        full_code = f"{entry.club_code}:{generate_random_code()}"
+        await self.store.push_code(entry.club_code, full_code)
+        await self.events.publish(entry.club_code, {"type": CODE_EVENT, "code": full_code})
+
+    async def _check_heartbeat(self, entry: ScheduledSession, now: float):
+        for websocket, client in list(entry.clients.items()):
+            if client.heartbeat and now - client.last_seen > ATTENDANCE_HEARTBEAT_TIMEOUT_SECONDS:
+                logger.info("[출석세션] 응답 없는 연결 종료: %s", entry.club_code)
+                await self._drop(entry, websocket)
+
+    #세션에 연결된 모든 화면에 전송
+    async def broadcast(self, club_code: str, message: str):
+        entry = self.sessions.get(club_code)
+        if entry is None:
+            return
+        await asyncio.gather(
+            *(self._send(entry, websocket, message) for websocket in list(entry.clients)),
+            return_exceptions=True,
+        )
+
+    async def _send(self, entry: ScheduledSession, websocket: WebSocket, message: str):
+        try:
+            await asyncio.wait_for(websocket.send_text(message), timeout=ATTENDANCE_SEND_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.info("[출석세션] 전송 실패로 연결 종료: %s (%s)", entry.club_code, e)
+            await self._drop(entry, websocket)
+
+    #소켓을 닫으면 handle_connection의 수신 루프가 끝나면서 연결이 정리됨
+    async def _drop(self, entry: ScheduledSession, websocket: WebSocket):
+        entry.clients.pop(websocket, None)
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._jobs):
+            task.cancel()
+
+
+code_scheduler = CodeRotationScheduler()
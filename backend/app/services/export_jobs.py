@@ -0,0 +1,226 @@
+import asyncio
+import glob
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from typing import Optional
+from fastapi import HTTPException
+from app.db import AsyncSessionLocal
+from app.redis_client import get_redis
+from app.services.attendance_matrix import load_attendance_matrix
+from app.services.club_version import club_versions
+from app.services.export_service import stream_excel, stream_csv, stream_parquet
+from app.logger import get_admin_logger
+
+logger = get_admin_logger()
+
+# 작업 상태는 Redis에 두므로 여러 서버에서 실행하면 이 디렉터리를 서버끼리 공유해야 다른 서버에서도 다운로드 가능
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "attendance-exports"))
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "2"))
+EXPORT_JOB_MAX_PENDING = int(os.getenv("EXPORT_JOB_MAX_PENDING", "32"))
+EXPORT_JOB_TTL_SECONDS = int(os.getenv("EXPORT_JOB_TTL_SECONDS", "3600"))
+# 파일 하나를 만드는 최대 시간: 넘기면(워커 비정상 종료 등) 작업을 실패로 보고 다시 요청할 수 있게 함
+EXPORT_JOB_LOCK_SECONDS = int(os.getenv("EXPORT_JOB_LOCK_SECONDS", "600"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class ExportJob:
+    def __init__(self, club_code: str, format: str, version: str, path: str, job_id: str = None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.club_code = club_code
+        self.format = format
+        self.version = version
+        self.path = path
+        self.status = PENDING
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_hash(self) -> dict:
+        return {
+            "club_code": self.club_code,
+            "format": self.format,
+            "version": self.version,
+            "path": self.path,
+            "status": self.status,
+            "error": self.error or "",
+            "created_at": self.created_at,
+            "finished_at": self.finished_at or "",
+        }
+
+    @classmethod
+    def from_hash(cls, job_id: str, data: dict) -> "ExportJob":
+        job = cls(data["club_code"], data["format"], data["version"], data["path"], job_id=job_id)
+        job.status = data["status"]
+        job.error = data["error"] or None
+        job.created_at = float(data["created_at"])
+        job.finished_at = float(data["finished_at"]) if data["finished_at"] else None
+        return job
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "format": self.format,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+# 동아리 코드는 대소문자를 구분하므로 파일 이름에는 해시 사용
+def _club_prefix(club_code: str) -> str:
+    return hashlib.sha256(club_code.encode()).hexdigest()[:16]
+
+
+async def _write_export(club_code: str, format: str, fileobj):
+    if format == "csv":
+        chunks = stream_csv(club_code)
+    elif format == "parquet":
+        chunks = stream_parquet(club_code)
+    else:
+        async with AsyncSessionLocal() as db:
+            attendance = await load_attendance_matrix(club_code, db)
+        chunks = stream_excel(attendance)
+    async for chunk in chunks:
+        fileobj.write(chunk)
+
+
+#내보내기 파일을 백그라운드에서 만들고 (동아리, 데이터 버전, 형식)별로 디스크에 보관
+# 작업 상태는 Redis에 두어 어느 워커로 상태 확인/다운로드 요청이 가도 같은 작업을 찾음
+class ExportJobManager:
+    def __init__(self, cache_dir: str = EXPORT_CACHE_DIR, workers: int = EXPORT_JOB_WORKERS, redis=None):
+        self.cache_dir = cache_dir
+        self._redis = redis
+        # 이 워커에서 실행 중인 작업 (태스크가 도중에 사라지지 않도록 참조 유지)
+        self.tasks = set()
+        self._slots = asyncio.Semaphore(workers)
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def _job_key(self, job_id: str) -> str:
+        return f"export:job:{job_id}"
+
+    # 같은 파일을 만드는 작업 id (파일을 만드는 동안만 유지)
+    def _running_key(self, path: str) -> str:
+        return f"export:running:{os.path.basename(path)}"
+
+    async def _save(self, job: ExportJob):
+        key = self._job_key(job.job_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=job.to_hash())
+            pipe.expire(key, EXPORT_JOB_TTL_SECONDS)
+            await pipe.execute()
+
+    async def _load(self, job_id: str) -> Optional[ExportJob]:
+        data = await self.redis.hgetall(self._job_key(job_id))
+        return ExportJob.from_hash(job_id, data) if data else None
+
+    async def _running_job(self, running_key: str) -> Optional[ExportJob]:
+        job_id = await self.redis.get(running_key)
+        return await self._load(job_id) if job_id else None
+
+    def cache_path(self, club_code: str, format: str, version: str) -> str:
+        return os.path.join(self.cache_dir, f"{_club_prefix(club_code)}-{version}.{format}")
+
+    #출석 데이터가 바뀌지 않았으면 이전에 만든 파일 경로 반환
+    async def cached_file(self, club_code: str, format: str):
+        version = await club_versions.get(club_code)
+        path = self.cache_path(club_code, format, version)
+        return path if os.path.exists(path) else None
+
+    async def submit(self, club_code: str, format: str) -> ExportJob:
+        version = await club_versions.get(club_code)
+        path = self.cache_path(club_code, format, version)
+
+        job = ExportJob(club_code, format, version, path)
+        if os.path.exists(path):
+            job.status = DONE
+            job.finished_at = time.time()
+            await self._save(job)
+            return job
+
+        # 같은 버전을 어느 워커에서든 만드는 중이면 그 작업을 그대로 반환
+        running_key = self._running_key(path)
+        running = await self._running_job(running_key)
+        if running is not None:
+            return running
+        if len(self.tasks) >= EXPORT_JOB_MAX_PENDING:
+            raise HTTPException(status_code=429, detail="대기 중인 내보내기 작업이 너무 많습니다. 잠시 후 다시 시도해주세요.")
+
+        await self._save(job)
+        if not await self.redis.set(running_key, job.job_id, nx=True, ex=EXPORT_JOB_LOCK_SECONDS):
+            # 그 사이 다른 워커가 먼저 시작함
+            running = await self._running_job(running_key)
+            if running is not None:
+                await self.redis.delete(self._job_key(job.job_id))
+                return running
+            await self.redis.set(running_key, job.job_id, ex=EXPORT_JOB_LOCK_SECONDS)
+        task = asyncio.create_task(self._run(job))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return job
+
+    async def get(self, job_id: str, club_code: str) -> ExportJob:
+        job = await self._load(job_id)
+        if job is None or job.club_code != club_code:
+            raise HTTPException(status_code=404, detail="내보내기 작업을 찾을 수 없습니다.")
+        # 만들던 워커가 끝내지 못하고 사라졌으면 실패로 표시
+        if job.status in (PENDING, RUNNING) and await self.redis.get(self._running_key(job.path)) != job.job_id:
+            job.status = FAILED
+            job.error = "내보내기 작업이 중단되었습니다. 다시 요청해주세요."
+        return job
+
+    async def _run(self, job: ExportJob):
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                await self._save(job)
+                # 순서를 기다리는 동안 잠금이 만료되지 않도록 만들기 시작할 때 다시 잡음
+                await self.redis.set(self._running_key(job.path), job.job_id, ex=EXPORT_JOB_LOCK_SECONDS)
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # 다 만든 뒤에 이름을 바꿔서 만들다 만 파일이 캐시로 쓰이지 않도록 함
+                tmp_path = f"{job.path}.{job.job_id}.tmp"
+                try:
+                    with open(tmp_path, "wb") as f:
+                        await _write_export(job.club_code, job.format, f)
+                    os.replace(tmp_path, job.path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            job.status = DONE
+            self._remove_stale_files(job)
+        except Exception as e:
+            logger.error("[내보내기] 작업 실패 club=%s format=%s: %s", job.club_code, job.format, e)
+            job.status = FAILED
+            job.error = "내보내기 파일 생성에 실패했습니다."
+        finally:
+            job.finished_at = time.time()
+            try:
+                await self._save(job)
+                running_key = self._running_key(job.path)
+                if await self.redis.get(running_key) == job.job_id:
+                    await self.redis.delete(running_key)
+            except Exception as e:
+                logger.error("[내보내기] 작업 상태 저장 실패 job=%s: %s", job.job_id, e)
+
+    # 데이터가 바뀌어 더 이상 쓰이지 않는 이전 버전 파일 삭제
+    def _remove_stale_files(self, job: ExportJob):
+        pattern = os.path.join(self.cache_dir, f"{_club_prefix(job.club_code)}-*.{job.format}")
+        for path in glob.glob(pattern):
+            if path != job.path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+export_jobs = ExportJobManager()
@@ -0,0 +1,305 @@
+import asyncio
+import concurrent.futures
+import csv
+import io
+import os
+import threading
+from urllib.parse import quote
+import numpy as np
+from fastapi import HTTPException
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from sqlalchemy import select, and_
+from app.db import AsyncSessionLocal
+from app.models import Attendance, AttendanceDate, StuClub, User
+from app.services.attendance_matrix import AttendanceMatrix
+
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+EXPORT_QUEUE_CHUNKS = int(os.getenv("EXPORT_QUEUE_CHUNKS", "8"))
+# 서버 측 커서에서 한 번에 가져올 행 수 / CSV·Parquet 한 덩어리에 담을 회원 수
+EXPORT_FETCH_ROWS = int(os.getenv("EXPORT_FETCH_ROWS", "2000"))
+EXPORT_MEMBERS_PER_CHUNK = int(os.getenv("EXPORT_MEMBERS_PER_CHUNK", "500"))
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+EXPORT_MEDIA_TYPES = {
+    "xlsx": XLSX_MEDIA_TYPE,
+    "csv": CSV_MEDIA_TYPE,
+    "parquet": PARQUET_MEDIA_TYPE,
+}
+EXPORT_FORMATS = tuple(EXPORT_MEDIA_TYPES)
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+#작업 스레드에서 쓴 바이트를 일정 크기로 모아 이벤트 루프의 큐로 넘기는 파일 객체
+class _ChunkWriter:
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self.loop = loop
+        self.queue = queue
+        self.buffer = bytearray()
+        self.cancelled = threading.Event()
+        self.aborted = False
+
+    def write(self, data) -> int:
+        if self.aborted:
+            # 중단 후 정리 과정에서 쓰는 내용은 버림
+            return len(data)
+        if self.cancelled.is_set():
+            self.aborted = True
+            raise ExportCancelled()
+        self.buffer += data
+        if len(self.buffer) >= EXPORT_CHUNK_BYTES:
+            self._put(bytes(self.buffer))
+            self.buffer.clear()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    # 큐가 가득 차면 (클라이언트가 느리면) 작업 스레드가 기다림
+    def _put(self, item):
+        future = asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop)
+        while True:
+            try:
+                return future.result(timeout=1)
+            except concurrent.futures.TimeoutError:
+                if self.cancelled.is_set():
+                    future.cancel()
+                    self.aborted = True
+                    raise ExportCancelled()
+
+    def run(self, write, *args):
+        try:
+            write(self, *args)
+            if self.buffer:
+                self._put(bytes(self.buffer))
+        finally:
+            if not self.cancelled.is_set():
+                self._put(None)
+
+
+# write(fileobj, *args)를 작업 스레드에서 실행하면서 만들어지는 바이트를 바로 전송
+async def stream_from_thread(write, *args):
+    queue = asyncio.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+    writer = _ChunkWriter(asyncio.get_running_loop(), queue)
+    task = asyncio.create_task(asyncio.to_thread(writer.run, write, *args))
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            yield chunk
+        await task
+    finally:
+        # 다운로드가 중간에 끊기면 작업 스레드도 중단
+        writer.cancelled.set()
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+def attendance_sheet_rows(attendance: AttendanceMatrix):
+    marks = np.where(attendance.matrix, "O", "X").tolist()
+    totals = attendance.matrix.sum(axis=1).tolist()
+    date_count = len(attendance.dates)
+    for user_id, name, row, total in zip(attendance.user_ids, attendance.names, marks, totals):
+        yield [user_id, name, *row, f"{total} / {date_count}"]
+
+
+def attendance_sheet_header(attendance: AttendanceMatrix) -> list:
+    return ["아이디", "이름", *attendance.date_columns, "비고"]
+
+
+def _write_excel(fileobj, attendance: AttendanceMatrix):
+    # write-only 모드는 행을 임시 파일로 내보내므로 전체 시트를 메모리에 두지 않음
+    # 다만 xlsx(zip)는 save()에서 모든 행을 쓴 뒤에 만들어지므로 fileobj에는 그때부터 기록됨
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    header = []
+    for title in attendance_sheet_header(attendance):
+        cell = WriteOnlyCell(sheet, value=title)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+    for row in attendance_sheet_rows(attendance):
+        sheet.append(row)
+    workbook.save(fileobj)
+
+
+#엑셀 파일을 작업 스레드에서 만들어 전송
+# 시트를 다 쓴 뒤 압축하는 동안 나오는 바이트부터 전송하므로 CSV처럼 조회하면서 바로 보내지는 않음
+# (큰 동아리는 백그라운드 내보내기 작업으로 파일을 만든 뒤 다운로드)
+def stream_excel(attendance: AttendanceMatrix):
+    return stream_from_thread(_write_excel, attendance)
+
+
+def export_filename(club_code: str, extension: str) -> str:
+    return quote(f"출석부_{club_code}.{extension}")
+
+
+def _member_block(user_ids: list, names: list, dates: list, cells: list) -> AttendanceMatrix:
+    matrix = np.zeros((len(user_ids), len(dates)), dtype=bool)
+    if cells:
+        rows, cols = zip(*cells)
+        matrix[list(rows), list(cols)] = True
+    return AttendanceMatrix(user_ids, names, dates, matrix)
+
+
+# 회원 × 출석 조인을 서버 측 커서로 읽으면서 회원 EXPORT_MEMBERS_PER_CHUNK명 단위의 행렬로 나눠 반환
+# (빈 동아리도 헤더를 쓸 수 있도록 최소 한 덩어리는 반환)
+async def iter_attendance_blocks(club_code: str, session_factory=AsyncSessionLocal):
+    # 응답 본문을 보내는 동안에는 요청의 DB 세션이 이미 닫혀 있으므로 별도 세션 사용
+    async with session_factory() as db:
+        date_result = await db.execute(
+            select(AttendanceDate.id, AttendanceDate.date)
+            .where(AttendanceDate.club_code == club_code)
+            .order_by(AttendanceDate.date)
+        )
+        dates = date_result.all()
+        date_index = {date_id: i for i, (date_id, _) in enumerate(dates)}
+        date_values = [d for _, d in dates]
+
+        club_date_ids = select(AttendanceDate.id).where(AttendanceDate.club_code == club_code)
+        stmt = (
+            select(User.user_id, User.name, Attendance.attendance_date_id)
+            .select_from(StuClub)
+            .join(User, User.user_id == StuClub.user_id)
+            .outerjoin(Attendance, and_(
+                Attendance.user_id == StuClub.user_id,
+                Attendance.status == True,
+                Attendance.attendance_date_id.in_(club_date_ids),
+            ))
+            .where(StuClub.club_code == club_code)
+            .where(User.is_leader == False)
+            .order_by(User.name, User.user_id)
+            .execution_options(yield_per=EXPORT_FETCH_ROWS)
+        )
+        result = await db.stream(stmt)
+
+        user_ids, names, cells = [], [], []
+        sent = False
+        async for partition in result.partitions():
+            for user_id, name, date_id in partition:
+                if not user_ids or user_ids[-1] != user_id:
+                    # 한 회원의 출석이 두 덩어리로 나뉘지 않도록 새 회원이 시작될 때만 자름
+                    if len(user_ids) >= EXPORT_MEMBERS_PER_CHUNK:
+                        yield _member_block(user_ids, names, date_values, cells)
+                        sent = True
+                        user_ids, names, cells = [], [], []
+                    user_ids.append(user_id)
+                    names.append(name)
+                col = date_index.get(date_id)
+                if col is not None:
+                    cells.append((len(user_ids) - 1, col))
+
+        if user_ids or not sent:
+            yield _member_block(user_ids, names, date_values, cells)
+
+
+def _encode_csv(block: AttendanceMatrix, header: bool) -> bytes:
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    if header:
+        writer.writerow(["user_id", "name", *block.date_columns, "attended"])
+    values = block.matrix.astype(np.uint8).tolist()
+    totals = block.matrix.sum(axis=1).tolist()
+    writer.writerows(
+        [user_id, name, *row, total]
+        for user_id, name, row, total in zip(block.user_ids, block.names, values, totals)
+    )
+    return output.getvalue().encode("utf-8")
+
+
+#날짜마다 0/1 열을 가진 CSV를 회원 덩어리 단위로 만들면서 전송
+async def stream_csv(club_code: str, session_factory=AsyncSessionLocal):
+    header = True
+    async for block in iter_attendance_blocks(club_code, session_factory):
+        yield await asyncio.to_thread(_encode_csv, block, header)
+        header = False
+
+
+def require_parquet():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=501, detail="parquet 내보내기를 사용할 수 없습니다. (pyarrow 미설치)")
+
+
+#ParquetWriter가 쓴 바이트를 덩어리마다 꺼내 가는 파일 객체
+class _ParquetSink:
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+#회원 덩어리 하나를 row group 하나로 기록
+class _ParquetEncoder:
+    def __init__(self, date_columns: list):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema(
+            [("user_id", pa.string()), ("name", pa.string())]
+            + [(column, pa.bool_()) for column in date_columns]
+            + [("attended", pa.int32())]
+        )
+        self.sink = _ParquetSink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression="zstd")
+
+    def encode(self, block: AttendanceMatrix) -> bytes:
+        arrays = [self.pa.array(block.user_ids, self.pa.string()), self.pa.array(block.names, self.pa.string())]
+        arrays += [self.pa.array(block.matrix[:, i]) for i in range(block.matrix.shape[1])]
+        arrays.append(self.pa.array(block.matrix.sum(axis=1).astype(np.int32)))
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        return self.sink.drain()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+async def stream_parquet(club_code: str, session_factory=AsyncSessionLocal):
+    encoder = None
+    async for block in iter_attendance_blocks(club_code, session_factory):
+        if encoder is None:
+            encoder = _ParquetEncoder(block.date_columns)
+        chunk = await asyncio.to_thread(encoder.encode, block)
+        if chunk:
+            yield chunk
+    yield await asyncio.to_thread(encoder.close)
+
+
+#이미 메모리에 있는 행렬(보관된 출석부 등)을 형식에 맞게 전송
+async def stream_matrix(attendance: AttendanceMatrix, format: str):
+    if format == "csv":
+        yield await asyncio.to_thread(_encode_csv, attendance, True)
+    elif format == "parquet":
+        encoder = _ParquetEncoder(attendance.date_columns)
+        chunk = await asyncio.to_thread(encoder.encode, attendance)
+        if chunk:
+            yield chunk
+        yield await asyncio.to_thread(encoder.close)
+    else:
+        async for chunk in stream_excel(attendance):
+            yield chunk
@@ -0,0 +1,115 @@
+import os
+import time
+from typing import Optional
+from fastapi import HTTPException, Request
+from app.redis_client import get_redis
+from app.services.service import get_token_user_id
+from app.logger import get_api_logger
+
+logger = get_api_logger()
+
+# 읽기 전용 복제본 주소 (없으면 모든 조회가 기본 DB 사용)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+READ_REPLICA_ENABLED = bool(DATABASE_READ_URL)
+# 쓰기 직후 이 시간 동안은 복제 지연을 피하기 위해 기본 DB에서 조회
+READ_AFTER_WRITE_SECONDS = int(os.getenv("READ_AFTER_WRITE_SECONDS", "10"))
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+#워커 하나에서만 유지되는 기본 DB 고정 기록
+class MemoryPrimaryPins:
+    def __init__(self):
+        self.pins = {}
+
+    async def pin(self, key: str, seconds: int):
+        now = time.monotonic()
+        self.pins[key] = now + seconds
+        # 오래된 기록 정리
+        if len(self.pins) > 10000:
+            self.pins = {k: until for k, until in self.pins.items() if until > now}
+
+    async def is_pinned(self, key: str) -> bool:
+        until = self.pins.get(key)
+        return until is not None and until > time.monotonic()
+
+
+class RedisPrimaryPins:
+    def __init__(self, redis=None):
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    async def pin(self, key: str, seconds: int):
+        await self.redis.set(f"db:primary:{key}", 1, ex=seconds)
+
+    async def is_pinned(self, key: str) -> bool:
+        return bool(await self.redis.exists(f"db:primary:{key}"))
+
+
+# 복제본을 쓰면 출석 세션 저장소 설정과 관계없이 항상 Redis 사용
+# (쓰기를 받은 워커와 다음 조회를 받는 워커가 달라도 기본 DB로 보내야 함)
+def create_primary_pins():
+    if READ_REPLICA_ENABLED:
+        return RedisPrimaryPins()
+    return MemoryPrimaryPins()
+
+
+primary_pins = create_primary_pins()
+
+
+def _request_user_id(request: Request) -> Optional[str]:
+    auth = request.headers.get("authorization", "")
+    token = auth[7:] if auth.startswith("Bearer ") else request.cookies.get("access_token")
+    if not token:
+        return None
+    try:
+        return get_token_user_id(token)
+    except HTTPException:
+        return None
+
+
+# 저장소 오류로 조회/쓰기가 실패하지 않도록 기록만 남기고 기본 DB 쪽으로 판단
+async def _is_pinned(key: str) -> bool:
+    try:
+        return await primary_pins.is_pinned(key)
+    except Exception as e:
+        logger.error("[읽기분산] 고정 여부 확인 실패 %s: %s", key, e)
+        return True
+
+
+async def _pin(key: str):
+    try:
+        await primary_pins.pin(key, READ_AFTER_WRITE_SECONDS)
+    except Exception as e:
+        logger.error("[읽기분산] 고정 기록 실패 %s: %s", key, e)
+
+
+#쓰기 요청이 성공하면 그 사용자의 이후 조회를 잠시 기본 DB로 보냄
+async def pin_user_after_write(request: Request, status_code: int):
+    if not READ_REPLICA_ENABLED or request.method not in WRITE_METHODS or status_code >= 400:
+        return
+    user_id = _request_user_id(request)
+    if user_id:
+        await _pin(f"user:{user_id}")
+
+
+async def user_prefers_primary(request: Request) -> bool:
+    if not READ_REPLICA_ENABLED:
+        return True
+    user_id = _request_user_id(request)
+    return user_id is not None and await _is_pinned(f"user:{user_id}")
+
+
+#동아리 데이터가 바뀐 직후에는 다른 회원의 조회도 기본 DB로 보냄
+# (복제본의 이전 데이터가 새 데이터 버전의 ETag/내보내기 파일로 저장되지 않도록)
+async def pin_club_after_write(club_code: str):
+    if READ_REPLICA_ENABLED:
+        await _pin(f"club:{club_code}")
+
+
+async def club_prefers_primary(club_code: str) -> bool:
+    return not READ_REPLICA_ENABLED or await _is_pinned(f"club:{club_code}")
@@ -3,6 +3,7 @@ from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import ClubSchedule
 from app.services.club_service import check_joining
+from app.services.club_version import bump_club_version, SCHEDULES
 
 
 async def create_schedule(
@@ -22,6 +23,7 @@ async def create_schedule(
     )
     db.add(schedule)
     await db.commit()
+    await bump_club_version(club_code, SCHEDULES)
     await db.refresh(schedule)
     return schedule
 
@@ -48,6 +50,7 @@ async def delete_schedule_for_club(schedule_id: int, club_code: str, db: AsyncSe
 
     await db.execute(delete(ClubSchedule).where(ClubSchedule.id == schedule_id))
     await db.commit()
+    await bump_club_version(club_code, SCHEDULES)
     return {"message": "일정이 삭제되었습니다."}
 
 
@@ -73,6 +76,7 @@ async def update_schedule_for_club(
     schedule.description = description.strip() if description else None
     schedule.scheduled_at = scheduled_at
     await db.commit()
+    await bump_club_version(club_code, SCHEDULES)
     await db.refresh(schedule)
     return schedule
 
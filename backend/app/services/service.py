@@ -22,17 +22,23 @@ def get_access_token_from_request(
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="인증 토큰이 없습니다.")
 
 
-async def get_current_user(token: str, db: AsyncSession) -> User:
+#토큰 서명만 검증하고 user_id 반환 (DB 조회 없음)
+def get_token_user_id(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="올바르지않은 토큰")
-        
-        result = await db.execute(select(User).where(User.user_id == user_id))
-        user = result.scalar_one_or_none()
-        if user is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="유저존재하지않음")
-        return user
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="유효하지않음")
+    user_id: str = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="올바르지않은 토큰")
+    return user_id
+
+
+async def get_current_user(token: str, db: AsyncSession) -> User:
+    user_id = get_token_user_id(token)
+
+    result = await db.execute(select(User).where(User.user_id == user_id))
+    user = result.scalar_one_or_none()
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="유저존재하지않음")
+    return user
@@ -0,0 +1,215 @@
+import asyncio
+import os
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from fastapi import WebSocket
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.session_store import attendance_store, ATTENDANCE_HOLDER_TTL_SECONDS
+from app.services.attendance_events import (
+    attendance_events,
+    CODE_EVENT,
+    CODE_ACCEPTED_EVENT,
+    SESSION_CLOSED_EVENT,
+)
+from app.services.code_scheduler import code_scheduler
+from app.services.checkin_buffer import checkin_buffer
+from app.services.attend_service import get_date_id, load_session_roster
+from app.services.attendance_code import generate_random_code, is_totp_mode, current_full_code
+from app.logger import get_admin_logger
+
+logger = get_admin_logger()
+
+ATTENDANCE_SESSION_GRACE_SECONDS = int(os.getenv("ATTENDANCE_SESSION_GRACE_SECONDS", "30"))
+
+
+class HubSession:
+    def __init__(self, club_code: str, date: str):
+        self.club_code = club_code
+        self.date = date
+        self.sockets = set()
+        self.close_task = None
+        # 다른 워커의 코드/종료 이벤트 수신과 사용자 갱신 태스크
+        self.tasks = set()
+        self.subscription = AsyncExitStack()
+
+
+#(동아리, 날짜)별 출석 세션에 여러 리더 화면을 연결하고, 끊겨도 유예 시간 동안 세션 유지
+class AttendanceSessionHub:
+    def __init__(self, store=attendance_store, scheduler=code_scheduler, events=attendance_events, grace_seconds: int = ATTENDANCE_SESSION_GRACE_SECONDS):
+        self.store = store
+        self.scheduler = scheduler
+        self.events = events
+        self.grace_seconds = grace_seconds
+        self.sessions = {}
+        self._locks = defaultdict(asyncio.Lock)
+
+    async def join(self, club_code: str, date: str, websocket: WebSocket, db: AsyncSession) -> HubSession:
+        async with self._locks[club_code]:
+            key = (club_code, date)
+            session = self.sessions.get(key)
+            if session is None:
+                # 출석 저장소는 동아리당 하나의 세션만 가지므로 다른 날짜 세션은 종료
+                for other_key, other in list(self.sessions.items()):
+                    if other_key[0] == club_code:
+                        await self._close(other, notice="출석종료")
+
+                session = HubSession(club_code, date)
+                # 코드를 놓치지 않도록 세션에 합류하기 전에 이벤트 구독
+                events = await session.subscription.enter_async_context(self.events.subscribe(club_code))
+                try:
+                    # 다른 워커가 이미 연 세션이면 코드와 출석 현황을 그대로 이어서 사용
+                    if not await self.store.acquire(club_code, date):
+                        date_id = await get_date_id(date, club_code, db)
+                        members, attended = await load_session_roster(club_code, date_id, db)
+                        replaced = await self.store.open_session(club_code, date, date_id, members, attended)
+                        if replaced:
+                            # 다른 워커에 남아 있는 이전 날짜 세션 종료
+                            await self.events.publish(club_code, {"type": SESSION_CLOSED_EVENT, "date": replaced})
+                except BaseException:
+                    await session.subscription.aclose()
+                    raise
+                self.sessions[key] = session
+                self._spawn(session, self._listen(session, events))
+                self._spawn(session, self._keep_alive(session))
+                self.scheduler.register(club_code)
+            elif session.close_task is not None:
+                session.close_task.cancel()
+                session.close_task = None
+
+            session.sockets.add(websocket)
+            self.scheduler.add_client(club_code, websocket)
+
+        # 코드 교체를 다른 워커가 맡고 있어도 다음 교체까지 기다리지 않도록 현재 코드 전송
+        code = await self.current_code(club_code)
+        if code:
+            await websocket.send_text(code)
+        return session
+
+    def _spawn(self, session: HubSession, job):
+        task = asyncio.create_task(job)
+        session.tasks.add(task)
+        task.add_done_callback(session.tasks.discard)
+
+    #어느 워커에서 만든 코드든, 코드 출석 전환이든, 종료든 이 워커에 연결된 화면에 반영
+    async def _listen(self, session: HubSession, events):
+        club_code = session.club_code
+        async for event in events:
+            kind = event.get("type")
+            if kind == CODE_EVENT:
+                await self.scheduler.broadcast(club_code, event["code"])
+            elif kind == CODE_ACCEPTED_EVENT:
+                self.scheduler.accept(club_code)
+                await self.scheduler.broadcast(club_code, event["code"])
+            elif kind == SESSION_CLOSED_EVENT and event.get("date") == session.date:
+                async with self._locks[club_code]:
+                    await self._close(session, notice="출석종료")
+                return
+
+    #살아 있는 동안 사용자 등록을 갱신하고, 세션이 사라졌으면(다른 워커가 종료) 이 워커의 화면도 종료
+    async def _keep_alive(self, session: HubSession):
+        while True:
+            await asyncio.sleep(ATTENDANCE_HOLDER_TTL_SECONDS / 3)
+            try:
+                alive = await self.store.acquire(session.club_code, session.date)
+            except Exception as e:
+                logger.error("[출석세션] 세션 갱신 실패: %s (%s)", session.club_code, e)
+                continue
+            if not alive:
+                logger.info("[출석세션] 저장소에서 세션이 사라져 종료: %s %s", session.club_code, session.date)
+                async with self._locks[session.club_code]:
+                    await self._close(session, notice="출석종료")
+                return
+
+    async def leave(self, session: HubSession, websocket: WebSocket):
+        session.sockets.discard(websocket)
+        self.scheduler.remove_client(session.club_code, websocket)
+        key = (session.club_code, session.date)
+        if not session.sockets and self.sessions.get(key) is session and session.close_task is None:
+            session.close_task = asyncio.create_task(self._close_after_grace(session))
+
+    async def _close_after_grace(self, session: HubSession):
+        await asyncio.sleep(self.grace_seconds)
+        async with self._locks[session.club_code]:
+            if not session.sockets:
+                logger.info("[출석세션] 재연결 없이 유예 시간 만료: %s %s", session.club_code, session.date)
+                session.close_task = None
+                await self._close(session)
+
+    async def current_code(self, club_code: str):
+        if is_totp_mode() and not await self.store.is_accepted(club_code):
+            secret = await self.store.session_secret(club_code)
+            return current_full_code(club_code, secret) if secret else None
+        return await self.store.latest_code(club_code)
+
+    #코드 출석으로 전환하고 모든 워커에 연결된 화면에 고정 코드 전송
+    async def accept(self, session: HubSession) -> str:
+        club_code = session.club_code
+        self.scheduler.accept(club_code)
+        secret = await self.store.session_secret(club_code) if is_totp_mode() else None
+        if secret:
+            # 코드 출석은 화면에 고정된 현재 코드를 계속 허용
+            await self.store.push_code(club_code, current_full_code(club_code, secret))
+        await self.store.accept_code_mode(club_code)
+        latest_code = await self.store.latest_code(club_code)
+        if not latest_code:
+            latest_code = f"{club_code}:{generate_random_code()}"
+            await self.store.push_code(club_code, latest_code)
+        await self.events.publish(club_code, {"type": CODE_ACCEPTED_EVENT, "code": latest_code})
+        return latest_code
+
+    #저장소의 세션을 지우고 다른 워커에도 종료를 알려 모든 화면을 닫음
+    async def stop(self, session: HubSession):
+        async with self._locks[session.club_code]:
+            if self.sessions.get((session.club_code, session.date)) is not session:
+                return
+            await self.store.close_session(session.club_code)
+            await self.events.publish(session.club_code, {"type": SESSION_CLOSED_EVENT, "date": session.date})
+            await self._close(session, notice="출석종료")
+
+    #출석 날짜가 삭제/보관되면 그 날짜의 진행 중인 세션을 모든 워커에서 종료 (date_ids가 없으면 날짜와 관계없이)
+    async def end_session(self, club_code: str, date_ids=None):
+        async with self._locks[club_code]:
+            date = await self.store.end_session(club_code, date_ids)
+            if date is None:
+                return
+            logger.info("[출석세션] 출석 날짜가 삭제(보관)되어 종료: %s %s", club_code, date)
+            await self.events.publish(club_code, {"type": SESSION_CLOSED_EVENT, "date": date})
+            session = self.sessions.get((club_code, date))
+            if session is not None:
+                await self._close(session, notice="출석종료")
+
+    async def _close(self, session: HubSession, notice: str = None):
+        key = (session.club_code, session.date)
+        if self.sessions.get(key) is not session:
+            return
+        del self.sessions[key]
+        if session.close_task is not None:
+            session.close_task.cancel()
+            session.close_task = None
+        # 종료 이벤트를 받아 닫는 중인 수신 태스크 자신은 취소하지 않음
+        current = asyncio.current_task()
+        for task in list(session.tasks):
+            if task is not current:
+                task.cancel()
+
+        if notice:
+            await self.scheduler.broadcast(session.club_code, notice)
+        self.scheduler.unregister(session.club_code)
+        # 마지막 사용자가 놓으면 저장소가 세션을 삭제
+        if await self.store.release(session.club_code, session.date) == 0:
+            logger.info("[출석세션] 출석코드 삭제됨: %s", session.club_code)
+        await session.subscription.aclose()
+        await checkin_buffer.drain()
+
+        for websocket in list(session.sockets):
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+
+    async def close(self):
+        for session in list(self.sessions.values()):
+            await self._close(session)
+
+
+attendance_hub = AttendanceSessionHub()
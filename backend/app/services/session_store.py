@@ -0,0 +1,535 @@
+import os
+import secrets
+import time
+import uuid
+from collections import deque
+from typing import Optional
+from fastapi import HTTPException
+from app.redis_client import get_redis
+
+ATTENDANCE_SESSION_BACKEND = os.getenv("ATTENDANCE_SESSION_BACKEND", "memory").lower()
+ATTENDANCE_SESSION_TTL_SECONDS = int(os.getenv("ATTENDANCE_SESSION_TTL_SECONDS", "21600"))
+# 세션을 사용 중인 워커는 이 시간 안에 다시 갱신해야 함 (갱신이 끊긴 워커는 사용 중으로 보지 않음)
+ATTENDANCE_HOLDER_TTL_SECONDS = int(os.getenv("ATTENDANCE_HOLDER_TTL_SECONDS", "60"))
+# 이 프로세스(워커)를 구분하는 id
+WORKER_ID = uuid.uuid4().hex
+VALID_CODE_WINDOW = 5
+
+
+def _raise_no_session():
+    raise HTTPException(status_code=404, detail="출석 코드가 생성되어 있지 않습니다.")
+
+
+def _raise_code_mismatch():
+    raise HTTPException(status_code=400, detail="출석 코드가 일치하지 않습니다.")
+
+
+def _raise_not_member():
+    raise HTTPException(status_code=404, detail="동아리에 가입되어 있지 않습니다.")
+
+
+def _raise_already_attended():
+    raise HTTPException(status_code=409, detail="이미 출석이 등록되었습니다.")
+
+
+#단일 워커용 출석 세션 저장소
+class MemorySessionStore:
+    def __init__(self, worker_id: str = WORKER_ID):
+        self.sessions = {}
+        self.worker_id = worker_id
+
+    #같은 날짜 세션이 있으면 사용자로 등록만 하고, 없거나 다른 날짜면 새로 연 뒤 등록
+    # members: {user_id: 이름} / 다른 날짜 세션을 대체했으면 그 날짜 반환
+    async def open_session(self, club_code: str, date: str, date_id: int, members=None, attended=()):
+        session = self.sessions.get(club_code)
+        replaced = None
+        if session is None or session["date"] != date:
+            replaced = session["date"] if session else None
+            session = self.sessions[club_code] = {
+                "valid_codes": deque(maxlen=VALID_CODE_WINDOW),
+                "accepted": False,
+                "date": date,
+                "date_id": date_id,
+                "members": dict(members or {}),
+                "attended": set(attended),
+                "holders": {},
+                "secret": secrets.token_hex(32),
+            }
+        session["holders"][self.worker_id] = time.monotonic() + ATTENDANCE_HOLDER_TTL_SECONDS
+        return replaced
+
+    #같은 날짜 세션이 있을 때만 사용자로 등록(갱신)
+    async def acquire(self, club_code: str, date: str) -> bool:
+        session = self.sessions.get(club_code)
+        if session is None or session["date"] != date:
+            return False
+        session["holders"][self.worker_id] = time.monotonic() + ATTENDANCE_HOLDER_TTL_SECONDS
+        return True
+
+    #사용자에서 빠지고, 갱신 중인 사용자가 남지 않으면 세션 삭제 (남은 사용자 수 반환)
+    async def release(self, club_code: str, date: str) -> int:
+        session = self.sessions.get(club_code)
+        if session is None or session["date"] != date:
+            return -1
+        session["holders"].pop(self.worker_id, None)
+        now = time.monotonic()
+        session["holders"] = {h: until for h, until in session["holders"].items() if until > now}
+        if not session["holders"]:
+            del self.sessions[club_code]
+        return len(session["holders"])
+
+    # 한 워커뿐이므로 항상 코드를 교체하는 워커 (코드 출석으로 전환됐으면 교체하지 않음)
+    async def claim_rotator(self, club_code: str, ttl_ms: int = 0) -> bool:
+        session = self.sessions.get(club_code)
+        return session is not None and not session["accepted"]
+
+    async def release_rotator(self, club_code: str):
+        pass
+
+    async def close_session(self, club_code: str):
+        self.sessions.pop(club_code, None)
+
+    #진행 중인 세션의 date_id가 date_ids에 있으면(없으면 항상) 세션 삭제 후 그 날짜 반환
+    async def end_session(self, club_code: str, date_ids=None) -> Optional[str]:
+        session = self.sessions.get(club_code)
+        if session is None or (date_ids is not None and session["date_id"] not in date_ids):
+            return None
+        del self.sessions[club_code]
+        return session["date"]
+
+    async def session_secret(self, club_code: str) -> Optional[str]:
+        session = self.sessions.get(club_code)
+        return session["secret"] if session else None
+
+    async def push_code(self, club_code: str, full_code: str):
+        session = self.sessions.get(club_code)
+        if session is not None:
+            session["valid_codes"].append(full_code)
+
+    async def latest_code(self, club_code: str) -> Optional[str]:
+        session = self.sessions.get(club_code)
+        if not session or not session["valid_codes"]:
+            return None
+        return session["valid_codes"][-1]
+
+    async def accept_code_mode(self, club_code: str):
+        session = self.sessions.get(club_code)
+        if session is not None:
+            session["accepted"] = True
+
+    async def is_accepted(self, club_code: str) -> bool:
+        session = self.sessions.get(club_code)
+        return bool(session and session["accepted"])
+
+    #세션에 캐시된 명단으로 가입/코드/중복 출석을 확인하고 출석 정보 반환
+    async def validate_check_in(self, club_code: str, full_code: str, user_id: str, code_verified: bool = False) -> dict:
+        session = self.sessions.get(club_code)
+        if not session:
+            _raise_no_session()
+        if user_id not in session["members"]:
+            _raise_not_member()
+        if not code_verified and full_code not in session["valid_codes"]:
+            _raise_code_mismatch()
+        if user_id in session["attended"]:
+            _raise_already_attended()
+        session["attended"].add(user_id)
+        return {
+            "date_id": session["date_id"],
+            "name": session["members"][user_id],
+            "present": len(session["attended"]),
+            "total": len(session["members"]),
+        }
+
+    #실시간 출석 현황 초기값
+    async def snapshot(self, club_code: str) -> Optional[dict]:
+        session = self.sessions.get(club_code)
+        if not session:
+            return None
+        return {
+            "present": len(session["attended"]),
+            "total": len(session["members"]),
+            "attendees": [
+                {"user_id": user_id, "name": session["members"].get(user_id)}
+                for user_id in session["attended"]
+            ],
+        }
+
+    #저장에 실패한 출석 표시 되돌리기
+    async def unmark_attended(self, club_code: str, user_id: str):
+        session = self.sessions.get(club_code)
+        if session is not None:
+            session["attended"].discard(user_id)
+
+    #관리자가 출석부에서 바꾼 출석 상태를 진행 중인 같은 날짜 세션에 반영
+    async def sync_attended(self, club_code: str, date_id: int, attended=(), absent=()):
+        session = self.sessions.get(club_code)
+        if session is None or session["date_id"] != date_id:
+            return
+        session["attended"].update(user_id for user_id in attended if user_id in session["members"])
+        session["attended"].difference_update(absent)
+
+    async def add_member(self, club_code: str, user_id: str, name: str):
+        session = self.sessions.get(club_code)
+        if session is not None:
+            session["members"][user_id] = name
+
+    async def remove_member(self, club_code: str, user_id: str):
+        session = self.sessions.get(club_code)
+        if session is not None:
+            session["members"].pop(user_id, None)
+            session["attended"].discard(user_id)
+
+
+# KEYS[1]: 세션 해시, KEYS[2]: 유효 코드, KEYS[3]: 회원 명단, KEYS[4]: 출석자
+# ARGV[1]: 코드, ARGV[2]: user_id, ARGV[3]: 코드가 이미 계산으로 검증되었으면 1
+_VALIDATE_CHECK_IN_SCRIPT = """
+local date_id = redis.call('HGET', KEYS[1], 'date_id')
+if not date_id then
+    return {0}
+end
+local name = redis.call('HGET', KEYS[3], ARGV[2])
+if not name then
+    return {3}
+end
+local matched = ARGV[3] == '1'
+if not matched then
+    local codes = redis.call('LRANGE', KEYS[2], 0, -1)
+    for _, code in ipairs(codes) do
+        if code == ARGV[1] then
+            matched = true
+            break
+        end
+    end
+end
+if not matched then
+    return {1}
+end
+if redis.call('SADD', KEYS[4], ARGV[2]) == 0 then
+    return {4}
+end
+return {2, date_id, name, redis.call('SCARD', KEYS[4]), redis.call('HLEN', KEYS[3])}
+"""
+
+# 사용자(워커)는 holders 해시에 {워커 id: 만료 시각(ms)}로 기록하고 주기적으로 갱신
+_NOW_MS = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+"""
+
+# KEYS[1]: 세션 해시, KEYS[2]: 유효 코드, KEYS[3]: 회원 명단, KEYS[4]: 출석자, KEYS[5]: 사용자, KEYS[6]: 코드 교체 워커
+# ARGV[1]: 날짜, ARGV[2]: date_id, ARGV[3]: 비밀키, ARGV[4]: 워커 id, ARGV[5]: 사용자 유효 시간(ms), ARGV[6]: 세션 TTL,
+# ARGV[7]: 회원 수, 이후 (user_id, 이름) 쌍과 출석자 user_id
+# 같은 날짜 세션이 있으면 사용자로 등록만 하고, 없거나 다른 날짜면 새로 연 뒤 등록 (대체한 날짜 반환)
+_OPEN_SESSION_SCRIPT = _NOW_MS + """
+local current = redis.call('HGET', KEYS[1], 'date')
+local replaced = ''
+if current ~= ARGV[1] then
+    replaced = current or ''
+    redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5], KEYS[6])
+    redis.call('HSET', KEYS[1], 'date', ARGV[1], 'date_id', ARGV[2], 'accepted', 0, 'secret', ARGV[3])
+    local member_end = 7 + tonumber(ARGV[7]) * 2
+    for i = 8, member_end, 2 do
+        redis.call('HSET', KEYS[3], ARGV[i], ARGV[i + 1])
+    end
+    for i = member_end + 1, #ARGV do
+        redis.call('SADD', KEYS[4], ARGV[i])
+    end
+end
+redis.call('HSET', KEYS[5], ARGV[4], now + tonumber(ARGV[5]))
+for _, key in ipairs({KEYS[1], KEYS[3], KEYS[4], KEYS[5]}) do
+    redis.call('EXPIRE', key, ARGV[6])
+end
+return replaced
+"""
+
+# KEYS[1]: 세션 해시, KEYS[2]: 사용자 / ARGV[1]: 날짜, ARGV[2]: 워커 id, ARGV[3]: 사용자 유효 시간(ms), ARGV[4]: 세션 TTL
+_ACQUIRE_SCRIPT = _NOW_MS + """
+if redis.call('HGET', KEYS[1], 'date') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[2], now + tonumber(ARGV[3]))
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+
+# KEYS: _OPEN_SESSION_SCRIPT와 같음 / ARGV[1]: 날짜, ARGV[2]: 워커 id
+# 갱신이 끊긴(죽은) 워커도 함께 정리하고, 남은 사용자가 없으면 세션 삭제
+_RELEASE_SCRIPT = _NOW_MS + """
+if redis.call('HGET', KEYS[1], 'date') ~= ARGV[1] then
+    return -1
+end
+redis.call('HDEL', KEYS[5], ARGV[2])
+if redis.call('GET', KEYS[6]) == ARGV[2] then
+    redis.call('DEL', KEYS[6])
+end
+local holders = redis.call('HGETALL', KEYS[5])
+for i = 1, #holders, 2 do
+    if tonumber(holders[i + 1]) <= now then
+        redis.call('HDEL', KEYS[5], holders[i])
+    end
+end
+local remaining = redis.call('HLEN', KEYS[5])
+if remaining == 0 then
+    redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5], KEYS[6])
+end
+return remaining
+"""
+
+# KEYS[1]: 세션 해시, KEYS[2]: 코드 교체 워커 / ARGV[1]: 워커 id, ARGV[2]: 잠금 시간(ms)
+# 세션마다 한 워커만 코드를 교체하도록 잠금을 잡거나 연장 (코드 출석으로 전환됐으면 0)
+_CLAIM_ROTATOR_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'accepted') ~= '0' then
+    return 0
+end
+local owner = redis.call('GET', KEYS[2])
+if not owner then
+    redis.call('SET', KEYS[2], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+if owner == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# KEYS: _OPEN_SESSION_SCRIPT와 같음 / ARGV: 끝낼 date_id 목록 (없으면 진행 중인 세션)
+_END_SESSION_SCRIPT = """
+local session = redis.call('HMGET', KEYS[1], 'date', 'date_id')
+if not session[1] then
+    return ''
+end
+local matched = #ARGV == 0
+for _, date_id in ipairs(ARGV) do
+    if date_id == session[2] then
+        matched = true
+        break
+    end
+end
+if not matched then
+    return ''
+end
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5], KEYS[6])
+return session[1]
+"""
+
+# KEYS[1]: 세션 해시, KEYS[2]: 회원 명단, KEYS[3]: 출석자
+# ARGV[1]: date_id, ARGV[2]: 출석으로 바뀐 회원 수, 이후 출석 user_id와 결석 user_id
+_SYNC_ATTENDED_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'date_id') ~= ARGV[1] then
+    return 0
+end
+local attended_end = 2 + tonumber(ARGV[2])
+for i = 3, attended_end do
+    if redis.call('HEXISTS', KEYS[2], ARGV[i]) == 1 then
+        redis.call('SADD', KEYS[3], ARGV[i])
+    end
+end
+for i = attended_end + 1, #ARGV do
+    redis.call('SREM', KEYS[3], ARGV[i])
+end
+return 1
+"""
+
+_RELEASE_ROTATOR_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+#여러 워커/노드가 공유하는 Redis 기반 출석 세션 저장소
+class RedisSessionStore:
+    def __init__(self, redis=None, ttl_seconds: int = ATTENDANCE_SESSION_TTL_SECONDS, worker_id: str = WORKER_ID):
+        self._redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.worker_id = worker_id
+        self._check_in_script = None
+        self._scripts = {}
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    # Redis Cluster에서도 한 세션의 키가 같은 슬롯에 모이도록 해시태그 사용
+    def _session_key(self, club_code: str) -> str:
+        return f"attendance:{{{club_code}}}:session"
+
+    def _codes_key(self, club_code: str) -> str:
+        return f"attendance:{{{club_code}}}:codes"
+
+    def _members_key(self, club_code: str) -> str:
+        return f"attendance:{{{club_code}}}:members"
+
+    def _attended_key(self, club_code: str) -> str:
+        return f"attendance:{{{club_code}}}:attended"
+
+    def _holders_key(self, club_code: str) -> str:
+        return f"attendance:{{{club_code}}}:holders"
+
+    def _rotator_key(self, club_code: str) -> str:
+        return f"attendance:{{{club_code}}}:rotator"
+
+    def _keys(self, club_code: str) -> list:
+        return [
+            self._session_key(club_code),
+            self._codes_key(club_code),
+            self._members_key(club_code),
+            self._attended_key(club_code),
+        ]
+
+    def _all_keys(self, club_code: str) -> list:
+        return self._keys(club_code) + [self._holders_key(club_code), self._rotator_key(club_code)]
+
+    async def _run_script(self, source: str, keys: list, args: list):
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = self.redis.register_script(source)
+        return await script(keys=keys, args=args)
+
+    #확인과 생성을 한 스크립트에서 처리해 여러 워커가 동시에 열어도 세션을 덮어쓰지 않음
+    async def open_session(self, club_code: str, date: str, date_id: int, members=None, attended=()):
+        members = dict(members or {})
+        args = [
+            date,
+            date_id,
+            # totp 코드용 세션별 비밀키
+            secrets.token_hex(32),
+            self.worker_id,
+            ATTENDANCE_HOLDER_TTL_SECONDS * 1000,
+            self.ttl_seconds,
+            len(members),
+        ]
+        for user_id, name in members.items():
+            args += [user_id, name]
+        args += list(attended)
+        replaced = await self._run_script(_OPEN_SESSION_SCRIPT, self._all_keys(club_code), args)
+        return replaced or None
+
+    async def acquire(self, club_code: str, date: str) -> bool:
+        result = await self._run_script(
+            _ACQUIRE_SCRIPT,
+            [self._session_key(club_code), self._holders_key(club_code)],
+            [date, self.worker_id, ATTENDANCE_HOLDER_TTL_SECONDS * 1000, self.ttl_seconds],
+        )
+        return int(result) == 1
+
+    async def release(self, club_code: str, date: str) -> int:
+        return int(await self._run_script(_RELEASE_SCRIPT, self._all_keys(club_code), [date, self.worker_id]))
+
+    async def claim_rotator(self, club_code: str, ttl_ms: int = 0) -> bool:
+        result = await self._run_script(
+            _CLAIM_ROTATOR_SCRIPT,
+            [self._session_key(club_code), self._rotator_key(club_code)],
+            [self.worker_id, ttl_ms],
+        )
+        return int(result) == 1
+
+    async def release_rotator(self, club_code: str):
+        await self._run_script(_RELEASE_ROTATOR_SCRIPT, [self._rotator_key(club_code)], [self.worker_id])
+
+    async def close_session(self, club_code: str):
+        await self.redis.delete(*self._all_keys(club_code))
+
+    #확인과 삭제를 한 스크립트에서 처리해 그 사이 다른 날짜로 새로 연 세션은 지우지 않음
+    async def end_session(self, club_code: str, date_ids=None) -> Optional[str]:
+        if date_ids is not None and not date_ids:
+            return None
+        closed = await self._run_script(_END_SESSION_SCRIPT, self._all_keys(club_code), list(date_ids or ()))
+        return closed or None
+
+    async def session_secret(self, club_code: str) -> Optional[str]:
+        return await self.redis.hget(self._session_key(club_code), "secret")
+
+    async def push_code(self, club_code: str, full_code: str):
+        codes_key = self._codes_key(club_code)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(codes_key, full_code)
+            pipe.ltrim(codes_key, -VALID_CODE_WINDOW, -1)
+            for key in self._keys(club_code):
+                pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def latest_code(self, club_code: str) -> Optional[str]:
+        return await self.redis.lindex(self._codes_key(club_code), -1)
+
+    async def accept_code_mode(self, club_code: str):
+        await self.redis.hset(self._session_key(club_code), "accepted", 1)
+
+    async def is_accepted(self, club_code: str) -> bool:
+        return await self.redis.hget(self._session_key(club_code), "accepted") == "1"
+
+    #가입/코드/중복 출석 확인과 출석 표시를 한 번의 왕복으로 처리
+    async def validate_check_in(self, club_code: str, full_code: str, user_id: str, code_verified: bool = False) -> dict:
+        if self._check_in_script is None:
+            self._check_in_script = self.redis.register_script(_VALIDATE_CHECK_IN_SCRIPT)
+        result = await self._check_in_script(
+            keys=self._keys(club_code),
+            args=[full_code, user_id, 1 if code_verified else 0],
+        )
+        status = int(result[0])
+        if status == 0:
+            _raise_no_session()
+        if status == 1:
+            _raise_code_mismatch()
+        if status == 3:
+            _raise_not_member()
+        if status == 4:
+            _raise_already_attended()
+        return {
+            "date_id": int(result[1]),
+            "name": result[2],
+            "present": int(result[3]),
+            "total": int(result[4]),
+        }
+
+    async def snapshot(self, club_code: str) -> Optional[dict]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.exists(self._session_key(club_code))
+            pipe.hgetall(self._members_key(club_code))
+            pipe.smembers(self._attended_key(club_code))
+            exists, members, attended = await pipe.execute()
+        if not exists:
+            return None
+        return {
+            "present": len(attended),
+            "total": len(members),
+            "attendees": [
+                {"user_id": user_id, "name": members.get(user_id)}
+                for user_id in attended
+            ],
+        }
+
+    async def unmark_attended(self, club_code: str, user_id: str):
+        await self.redis.srem(self._attended_key(club_code), user_id)
+
+    async def sync_attended(self, club_code: str, date_id: int, attended=(), absent=()):
+        attended = list(attended)
+        await self._run_script(
+            _SYNC_ATTENDED_SCRIPT,
+            [self._session_key(club_code), self._members_key(club_code), self._attended_key(club_code)],
+            [date_id, len(attended)] + attended + list(absent),
+        )
+
+    #진행 중인 세션이 있을 때만 명단 갱신
+    async def add_member(self, club_code: str, user_id: str, name: str):
+        if await self.redis.exists(self._session_key(club_code)):
+            await self.redis.hset(self._members_key(club_code), user_id, name)
+
+    async def remove_member(self, club_code: str, user_id: str):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(self._members_key(club_code), user_id)
+            pipe.srem(self._attended_key(club_code), user_id)
+            await pipe.execute()
+
+
+def create_session_store():
+    if ATTENDANCE_SESSION_BACKEND == "redis":
+        return RedisSessionStore()
+    return MemorySessionStore()
+
+
+attendance_store = create_session_store()
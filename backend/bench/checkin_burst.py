@@ -0,0 +1,313 @@
+"""출석 폭주 시나리오 벤치마크
+
+리더 화면(WebSocket)이 코드를 교체하는 동안 학생 N명이 동시에 /attend/check_qr 를
+호출하는 상황을 로컬 대체 환경(SQLite 또는 로컬 MySQL, fakeredis)에서 재현하고
+지연 시간(p50/p95/p99), 처리량, 출석 1건당 DB 쿼리 수를 측정한다.
+
+    cd backend
+    pip install -r bench/requirements.txt
+    python -m bench.checkin_burst --students 300 --concurrency 300
+    python -m bench.checkin_burst --database-url mysql+aiomysql://root:pw@127.0.0.1:3306/bench
+    python -m bench.checkin_burst --write-behind --session-backend redis --json result.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import tempfile
+import time
+from datetime import date
+
+# 작업 디렉터리에 파일이 남지 않도록 기본 SQLite DB는 임시 디렉터리에 만듦 (실행할 때마다 다시 생성)
+DEFAULT_DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), 'attendance-bench.db')}?timeout=30"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="출석 폭주 시나리오 벤치마크")
+    parser.add_argument("--students", type=int, default=300, help="출석하는 학생 수")
+    parser.add_argument("--concurrency", type=int, default=300, help="동시에 요청하는 학생 수")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL, help="SQLAlchemy 비동기 DB URL")
+    parser.add_argument("--redis-url", help="실제 Redis 주소 (없으면 fakeredis 사용)")
+    parser.add_argument("--session-backend", choices=["memory", "redis"], default="memory", help="출석 세션 저장소")
+    parser.add_argument("--code-mode", choices=["random", "totp"], default="random", help="출석 코드 방식")
+    parser.add_argument("--write-behind", action="store_true", help="출석 쓰기 버퍼 사용")
+    parser.add_argument("--subscribe", action="store_true", help="리더 화면이 실시간 출석 이벤트를 구독")
+    parser.add_argument("--port", type=int, default=0, help="서버 포트 (0이면 빈 포트)")
+    parser.add_argument("--json", dest="json_path", help="결과를 JSON 파일로 저장 (릴리스별 비교용)")
+    return parser.parse_args(argv)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# app 모듈은 import 시점에 환경 변수를 읽으므로 import 전에 설정
+def configure_environment(args):
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.redis_url:
+        os.environ["REDIS_URL"] = args.redis_url
+    os.environ["ATTENDANCE_SESSION_BACKEND"] = args.session_backend
+    os.environ["ATTENDANCE_CODE_MODE"] = args.code_mode
+    os.environ["ATTENDANCE_WRITE_BEHIND"] = "true" if args.write_behind else "false"
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+    os.environ.setdefault("REFRESH_TOKEN_EXPIRE_DAYS", "1")
+    os.environ.setdefault("LOG_REQUEST_RESPONSE_BODY", "false")
+    # 테이블은 seed()에서 모델로 바로 만들므로 마이그레이션은 실행하지 않음
+    os.environ.setdefault("DB_SCHEMA_MODE", "create_all")
+
+
+def use_fakeredis():
+    from fakeredis import FakeAsyncRedis
+    from app import redis_client
+
+    redis_client._redis = FakeAsyncRedis(encoding="utf-8", decode_responses=True)
+
+
+# SQLite에는 MySQL 콜레이션(utf8mb4_bin)이 없으므로 테이블 생성 전에 제거
+def strip_mysql_collations(metadata):
+    for table in metadata.tables.values():
+        for column in table.columns:
+            if getattr(column.type, "collation", None):
+                column.type.collation = None
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        from sqlalchemy import event
+
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+async def seed(session_factory, metadata, engine, students: int):
+    from app.models import User, Club, StuClub, AttendanceDate
+
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.drop_all)
+        await conn.run_sync(metadata.create_all)
+
+    club_code = "BENCH"
+    leader_id = "bench-leader"
+    student_ids = [f"bench-student-{i:05d}" for i in range(students)]
+    async with session_factory() as db:
+        db.add(User(user_id=leader_id, name="리더", is_leader=True))
+        db.add_all(User(user_id=user_id, name=f"학생{i}", is_leader=False) for i, user_id in enumerate(student_ids))
+        await db.flush()
+        db.add(Club(club_name="벤치마크 동아리", club_code=club_code))
+        await db.flush()
+        db.add(StuClub(user_id=leader_id, club_code=club_code))
+        db.add_all(StuClub(user_id=user_id, club_code=club_code) for user_id in student_ids)
+        db.add(AttendanceDate(club_code=club_code, date=date.today(), set_by=leader_id))
+        await db.commit()
+    return club_code, leader_id, student_ids
+
+
+class Leader:
+    def __init__(self, url: str, token: str, subscribe: bool):
+        self.url = url
+        self.token = token
+        self.subscribe = subscribe
+        self.code = None
+        self.codes_received = 0
+        self.events_received = 0
+        self._first_code = asyncio.Event()
+        self._task = None
+        self._ws = None
+
+    async def start(self):
+        import websockets
+
+        self._ws = await websockets.connect(self.url)
+        await self._ws.send(f"Bearer {self.token}")
+        if self.subscribe:
+            await self._ws.send("subscribe_checkins")
+        self._task = asyncio.create_task(self._receive())
+        await asyncio.wait_for(self._first_code.wait(), timeout=30)
+
+    async def _receive(self):
+        async for message in self._ws:
+            if message.startswith("{"):
+                self.events_received += 1
+                continue
+            if ":" in message:
+                self.code = message
+                self.codes_received += 1
+                self._first_code.set()
+
+    async def stop(self):
+        try:
+            await self._ws.send("stop_attendance")
+        except Exception:
+            pass
+        await self._ws.close()
+        if self._task:
+            self._task.cancel()
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# 한 클라이언트의 연결 풀이 커지면 연결 탐색 비용이 커지므로 작은 클라이언트 여러 개로 분산
+CLIENT_POOL_SIZE = 32
+
+
+async def run_burst(base_url: str, leader: Leader, tokens: list, concurrency: int):
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+    client_count = max(1, -(-concurrency // CLIENT_POOL_SIZE))
+    limits = httpx.Limits(max_connections=CLIENT_POOL_SIZE, max_keepalive_connections=CLIENT_POOL_SIZE)
+    clients = [httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) for _ in range(client_count)]
+
+    async def check_in(index: int, token: str):
+        # 레이트 리미터가 IP 단위이므로 학생마다 다른 주소로 요청
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "X-Forwarded-For": f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+        }
+        client = clients[index % client_count]
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/attend/check_qr", json={"qr_code": leader.code}, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(check_in(i, token) for i, token in enumerate(tokens)))
+        elapsed = time.perf_counter() - started
+    finally:
+        for client in clients:
+            await client.aclose()
+
+    return latencies, statuses, elapsed
+
+
+async def main(args):
+    configure_environment(args)
+    if not args.redis_url:
+        # 레이트 리미터는 세션 저장소와 관계없이 Redis가 필요
+        use_fakeredis()
+
+    import uvicorn
+    from sqlalchemy import func, select
+    from app.main import app
+    from app.db import engine, AsyncSessionLocal
+    from app.models import Base, Attendance
+    from app.services.checkin_buffer import checkin_buffer
+    from app.services.user_service import create_access_token
+
+    # 요청마다 남는 접근 로그가 측정에 섞이지 않도록 경고 이상만 출력
+    for name in ("api", "user", "attendance", "admin", "club"):
+        logging.getLogger(f"hanssup.{name}").setLevel(logging.WARNING)
+
+    if engine.dialect.name == "sqlite":
+        strip_mysql_collations(Base.metadata)
+
+    club_code, leader_id, student_ids = await seed(AsyncSessionLocal, Base.metadata, engine, args.students)
+    tokens = [create_access_token({"sub": user_id}) for user_id in student_ids]
+
+    port = args.port or _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws="websockets"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    today = date.today().isoformat()
+    leader = Leader(
+        f"ws://127.0.0.1:{port}/admin/attendance/{today}/ws",
+        create_access_token({"sub": leader_id}),
+        args.subscribe,
+    )
+    await leader.start()
+
+    counter = QueryCounter(engine)
+    latencies, statuses, elapsed = await run_burst(f"http://127.0.0.1:{port}", leader, tokens, args.concurrency)
+    await checkin_buffer.drain()
+    queries = counter.count
+
+    async with AsyncSessionLocal() as db:
+        saved = await db.scalar(select(func.count()).select_from(Attendance).where(Attendance.status.is_(True)))
+
+    if args.subscribe:
+        # 마지막 이벤트가 도착할 때까지 잠시 대기
+        await asyncio.sleep(0.5)
+    await leader.stop()
+    server.should_exit = True
+    await server_task
+    await engine.dispose()
+
+    succeeded = statuses.get(200, 0)
+    result = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {
+            "students": args.students,
+            "concurrency": args.concurrency,
+            "database": engine.dialect.name,
+            "session_backend": args.session_backend,
+            "code_mode": args.code_mode,
+            "write_behind": args.write_behind,
+            "subscribe": args.subscribe,
+        },
+        "requests": len(latencies),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "saved_rows": saved,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+            "max": round(max(latencies), 2) if latencies else 0.0,
+        },
+        "db_queries": queries,
+        "db_queries_per_check_in": round(queries / succeeded, 2) if succeeded else None,
+        "leader_codes_received": leader.codes_received,
+        "leader_events_received": leader.events_received,
+    }
+    return result
+
+
+def print_report(result: dict):
+    config = result["config"]
+    latency = result["latency_ms"]
+    print(
+        f"students={config['students']} concurrency={config['concurrency']} db={config['database']} "
+        f"session={config['session_backend']} code={config['code_mode']} write_behind={config['write_behind']}"
+    )
+    print(f"statuses        {result['statuses']}  (saved rows: {result['saved_rows']})")
+    print(f"elapsed         {result['elapsed_seconds']} s")
+    print(f"throughput      {result['throughput_rps']} req/s")
+    print(f"latency (ms)    p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} max={latency['max']}")
+    print(f"db queries      {result['db_queries']} total, {result['db_queries_per_check_in']} per check-in")
+    if config["subscribe"]:
+        print(f"leader events   {result['leader_events_received']}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = asyncio.run(main(args))
+    print_report(result)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)